@@ -0,0 +1,192 @@
+"""Offline benchmarks for main.py against a mock scratchattach.
+
+Measures throughput and p50/p99 latency of the fetch, bulk fetch, projects and
+messages paths (through the real HTTP hooks, with simulated latency/errors)
+and of the record writers behind ``--format``. Results can be saved as a
+baseline and compared against one to flag regressions:
+
+    python benchmarks/bench.py --save benchmarks/baseline.json
+    python benchmarks/bench.py --compare benchmarks/baseline.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# The mock must shadow any installed scratchattach before main.py imports it
+sys.path.insert(0, os.path.join(HERE, "mock"))
+import scratchattach  # noqa: E402
+
+WRITER_RECORDS = 2000
+
+
+def load_main():
+    spec = importlib.util.spec_from_file_location("main_bench", os.path.join(ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def summarize(latencies, total_seconds, ops=None):
+    ops = ops if ops is not None else len(latencies)
+    return {
+        "ops": ops,
+        "seconds": round(total_seconds, 4),
+        "throughput": round(ops / total_seconds, 2) if total_seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def bench_fetch(main, n):
+    backend = main.LocalBackend()
+    start = time.perf_counter()
+    latencies = [timed(lambda i=i: backend.user(f"user{i}")) for i in range(n)]
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_fetch_bulk(main, n, workers=8):
+    latencies = []
+
+    def fetch(name):
+        t = time.perf_counter()
+        try:
+            return main.fetch_user_data(name)
+        finally:
+            latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    for _ in main.fetch_users_bulk((f"user{i}" for i in range(n)), workers=workers, fetch=fetch):
+        pass
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_projects(main, n, limit=100):
+    backend = main.LocalBackend()
+    start = time.perf_counter()
+    latencies = [timed(lambda i=i: list(backend.projects(f"user{i}", limit=limit))) for i in range(n)]
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_messages(main, n):
+    backend = main.LocalBackend(session=scratchattach.Session())
+    start = time.perf_counter()
+    latencies = [timed(lambda: list(backend.messages("benchmark", limit=40))) for _ in range(n)]
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def bench_writer(main, fmt, n):
+    records = [
+        {k: (i if k in ("id", "views", "loves") else f"{k} {i}") for k in main.PROJECT_FIELDS}
+        for i in range(WRITER_RECORDS)
+    ]
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"out.{fmt}")
+        start = time.perf_counter()
+        for _ in range(n):
+            def write():
+                with main.open_writer(fmt, path, envelope={"username": "u", "projects": None},
+                                      fieldnames=main.PROJECT_FIELDS) as w:
+                    w.write_many(records)
+            latencies.append(timed(write))
+        total = time.perf_counter() - start
+    # Throughput is in records per second for the writers
+    return summarize(latencies, total, ops=n * WRITER_RECORDS)
+
+
+def run_benchmarks(scenarios=None, quick=False, latency_ms=5.0, error_rate=0.0, payload_kb=1.0):
+    scratchattach.configure(latency_ms=latency_ms, error_rate=error_rate, payload_kb=payload_kb)
+    main = load_main()
+    # Measure the code, not the throttle; keep retry backoff short for error-rate runs
+    main.configure_rate_limit(0, 0, 4)
+    main.BACKOFF_BASE = 0.001
+    main.install_http_hooks()
+    n = 10 if quick else 100
+    table = {
+        "fetch": lambda: bench_fetch(main, n),
+        "fetch-bulk": lambda: bench_fetch_bulk(main, n * 4),
+        "projects": lambda: bench_projects(main, max(2, n // 10)),
+        "messages": lambda: bench_messages(main, max(2, n // 10)),
+    }
+    for fmt in sorted(main.WRITERS):
+        needs = {"yaml": "yaml", "parquet": "pyarrow", "arrow": "pyarrow"}.get(fmt)
+        if needs and main.optional_import(needs) is None:
+            continue
+        table[f"write-{fmt}"] = lambda fmt=fmt: bench_writer(main, fmt, 2 if quick else 5)
+    results = {}
+    for name, fn in table.items():
+        if scenarios and name not in scenarios:
+            continue
+        results[name] = fn()
+    return {
+        "settings": {"latency_ms": latency_ms, "error_rate": error_rate, "payload_kb": payload_kb, "quick": quick},
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Regressions: throughput below ``(1 - tolerance)`` x baseline, or p99 above ``(1 + tolerance)`` x baseline."""
+    problems = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        if cur["throughput"] < base["throughput"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {cur['throughput']} < baseline {base['throughput']}")
+        if base["p99_ms"] and cur["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p99 {cur['p99_ms']}ms > baseline {base['p99_ms']}ms")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (smoke test)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Mean simulated request latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--payload-kb", type=float, default=1.0, help="Size of profile text fields")
+    parser.add_argument("--save", help="Write the results to this baseline file")
+    parser.add_argument("--compare", help="Compare against this baseline file; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative slowdown when comparing (default 0.5)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.scenario, args.quick, args.latency_ms, args.error_rate, args.payload_kb)
+    print(f"{'scenario':<14}{'ops':>8}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, r in report["results"].items():
+        print(f"{name:<14}{r['ops']:>8}{r['throughput']:>12.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for p in problems:
+            print("REGRESSION:", p, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Offline stand-in for the parts of scratchattach that main.py uses (benchmarks only).
+
+Every call goes through ``scratchattach.utils.requests.requests.request`` just
+like the real library, so main.py's HTTP hooks (rate limiting, retries,
+request counting) are exercised. Latency, error rate and payload size are set
+with ``configure()``.
+"""
+import random
+
+from .utils import exceptions
+from .utils.requests import requests
+
+LoginDataWarning = exceptions.LoginDataWarning
+
+# Tunables, see configure()
+SETTINGS = {
+    "latency_ms": 5.0,       # mean simulated round-trip time
+    "error_rate": 0.0,       # fraction of requests answered with HTTP 500
+    "payload_kb": 1.0,       # size of free-text profile fields
+    "projects_per_user": 120,
+    "messages_per_user": 200,
+}
+_rng = random.Random(0)
+
+
+def configure(seed=0, **settings):
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise TypeError(f"unknown settings: {sorted(unknown)}")
+    SETTINGS.update(settings)
+    _rng.seed(seed)
+
+
+def _latency():
+    # Uniform jitter around the mean keeps p99 meaningfully above p50
+    return SETTINGS["latency_ms"] / 1000.0 * _rng.uniform(0.5, 1.5)
+
+
+def _text(n):
+    return ("lorem ipsum " * (n // 12 + 1))[:n]
+
+
+def _page(total, limit, offset, make):
+    return [make(i) for i in range(offset, min(offset + limit, total))]
+
+
+class User:
+    def __init__(self, username=None, _session=None, **entries):
+        self.username = username
+        self._session = _session
+        self.__dict__.update(entries)
+
+    def update(self):
+        resp = requests.get(f"https://api.scratch.mit.edu/users/{self.username}")
+        if resp.status_code != 200:
+            return False
+        data = resp.json()
+        size = int(SETTINGS["payload_kb"] * 1024)
+        self.id = data["id"]
+        self.about_me = _text(size // 2)
+        self.wiwo = _text(size // 2)
+        self.country = data["country"]
+        self.icon_url = f"https://cdn2.scratch.mit.edu/get_image/user/{data['id']}_90x90.png"
+        self.join_date = data["join_date"]
+        self.scratchteam = False
+        return True
+
+    def projects(self, *, limit=40, offset=0):
+        requests.get(f"https://api.scratch.mit.edu/users/{self.username}/projects/?limit={limit}&offset={offset}")
+        return _page(SETTINGS["projects_per_user"], limit, offset, lambda i: Project(
+            id=100000 + i, title=f"{self.username} project {i}", author_name=self.username,
+            views=i * 37, loves=i * 3, favorites=i * 2, remix_count=i % 5,
+            thumbnail_url=f"https://cdn2.scratch.mit.edu/get_image/project/{100000 + i}_480x360.png",
+        ))
+
+    def message_count(self):
+        requests.get(f"https://api.scratch.mit.edu/users/{self.username}/messages/count/")
+        return SETTINGS["messages_per_user"]
+
+    def followers(self, *, limit=40, offset=0):
+        requests.get(f"https://api.scratch.mit.edu/users/{self.username}/followers/?limit={limit}&offset={offset}")
+        return _page(60, limit, offset, lambda i: User(username=f"{self.username}_f{i}"))
+
+    def following(self, *, limit=40, offset=0):
+        requests.get(f"https://api.scratch.mit.edu/users/{self.username}/following/?limit={limit}&offset={offset}")
+        return _page(60, limit, offset, lambda i: User(username=f"{self.username}_g{i}"))
+
+
+class Project:
+    def __init__(self, **entries):
+        self.__dict__.update(entries)
+
+
+class Activity:
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class Session:
+    def __init__(self, username="benchmark", id="bench-session"):
+        self.username = username
+        self.id = id
+        self.session_string = None
+
+    def messages(self, *, limit=40, offset=0, **kwargs):
+        requests.get(f"https://api.scratch.mit.edu/users/{self.username}/messages?limit={limit}&offset={offset}")
+        return _page(SETTINGS["messages_per_user"], limit, offset, lambda i: Activity({
+            "id": 900000 - i, "type": "loveproject", "actor_username": f"fan{i}",
+            "project_title": f"project {i}", "datetime_created": "2024-01-01T00:00:00Z",
+        }))
+
+    def message_count(self):
+        requests.get("https://scratch.mit.edu/messages/ajax/get-message-count/")
+        return SETTINGS["messages_per_user"]
+
+    def update(self):
+        requests.post("https://scratch.mit.edu/session")
+        return True
+
+
+def get_user(username):
+    user = User(username=username)
+    user.update()
+    return user
+
+
+def login_by_session_string(session_string):
+    return Session()
+
+
+def login_by_id(session_id, username=None, **kwargs):
+    return Session(username=username or "benchmark", id=session_id)
+
+
+def login(username, password, **kwargs):
+    requests.post("https://scratch.mit.edu/login/")
+    return Session(username=username)
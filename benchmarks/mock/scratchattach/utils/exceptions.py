@@ -0,0 +1,10 @@
+class Unauthenticated(Exception):
+    pass
+
+
+class Unauthorized(Exception):
+    pass
+
+
+class LoginDataWarning(UserWarning):
+    pass
@@ -0,0 +1,38 @@
+"""Simulated HTTP session: sleeps for the configured latency and fails at the configured rate."""
+import time
+import zlib
+
+
+class Response:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = {}
+
+    def json(self):
+        return self._payload
+
+    @property
+    def text(self):
+        return str(self._payload)
+
+
+class Requests:
+    def request(self, method, url, *args, **kwargs):
+        import scratchattach
+        time.sleep(scratchattach._latency())
+        if scratchattach._rng.random() < scratchattach.SETTINGS["error_rate"]:
+            return Response(500, {"code": "InternalError"})
+        name = url.rstrip("/").split("/users/")[-1].split("/")[0]
+        return Response(200, {"id": zlib.crc32(name.encode()) % 10 ** 8, "username": name,
+                              "country": ("Germany", "France", "Brazil")[len(name) % 3],
+                              "join_date": "2015-06-01T00:00:00.000Z"})
+
+    def get(self, url, *args, **kwargs):
+        return self.request("GET", url, *args, **kwargs)
+
+    def post(self, url, *args, **kwargs):
+        return self.request("POST", url, *args, **kwargs)
+
+
+requests = Requests()
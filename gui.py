@@ -2,6 +2,7 @@ import sys
 import os
 import threading
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 # ensure local packages on sys.path
 local_packages = os.path.join(os.getcwd(), '.local-packages')
@@ -18,6 +19,12 @@ try:
 except Exception:
     scratchattach = None
 
+# Shared helpers from the CLI (rate limiting, retries, request accounting)
+try:
+    import main as cli
+except Exception:
+    cli = None
+
 HTML = """
 <!doctype html>
 <html>
@@ -45,9 +52,97 @@ HTML = """
 </html>
 """
 
+GUI_FIELDS = ['id', 'username', 'about_me', 'wiwo', 'country', 'join_date']
+
+
+def fetch_profile(username):
+    """Fetch the profile fields shown in the GUI (one upstream request via the CLI helper)."""
+    if cli is not None:
+        data = cli.fetch_user_data(username)
+        return {k: data.get(k) for k in GUI_FIELDS}
+    if scratchattach is None:
+        raise RuntimeError('scratchattach not available. Install requirements.')
+    user = scratchattach.User(username=username)
+    ok = user.update()
+    if not ok:
+        raise RuntimeError(f'Failed to fetch user: {ok}')
+    return {k: getattr(user, k, None) for k in GUI_FIELDS}
+
+
+class FetchPool:
+    """Fixed-size worker pool for GUI lookups.
+
+    Requests for a username already in flight share one upstream fetch, a newer
+    request supersedes older ones (queued lookups are cancelled and late results
+    are not shown), and recent results are served from an in-memory LRU.
+    """
+
+    def __init__(self, fetch=fetch_profile, workers=4, cache_size=256):
+        self.fetch = fetch
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gui-fetch')
+        self.cache = cli.MemoryCache(max_entries=cache_size) if cli is not None else None
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def request(self, username, deliver):
+        """Look up ``username`` and call ``deliver(data, error)`` unless a newer request came first."""
+        key = username.strip().lower()
+        created = False
+        stale = []
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            cached = self.cache.get('user', key) if self.cache is not None else None
+            if cached is None:
+                stale = [f for other, f in self._inflight.items() if other != key]
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self.executor.submit(self.fetch, username)
+                    self._inflight[key] = future
+                    created = True
+        # Future callbacks may run synchronously (on cancel, or when already done), so
+        # everything that can trigger them happens outside the lock. Lookups that
+        # already started cannot be cancelled; their results still fill the cache.
+        for f in stale:
+            f.cancel()
+        if cached is not None:
+            deliver(cached, None)
+            return
+        if created:
+            future.add_done_callback(lambda f: self._finished(key, f))
+
+        def done(f):
+            if f.cancelled():
+                return
+            with self._lock:
+                if generation != self._generation:
+                    return
+            error = f.exception()
+            deliver(None if error else f.result(), error)
+
+        future.add_done_callback(done)
+
+    def _finished(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if self.cache is not None and not future.cancelled() and future.exception() is None:
+            self.cache.set('user', key, future.result())
+
+    def close(self):
+        # shutdown(cancel_futures=...) needs Python 3.9, so queued lookups are cancelled by hand
+        with self._lock:
+            pending = list(self._inflight.values())
+        for future in pending:
+            future.cancel()
+        self.executor.shutdown(wait=False)
+
+
 class Api:
     def __init__(self, window):
         self.window = window
+        self.pool = FetchPool()
 
     def pyfetch(self):
         # called from JS when user clicks Fetch
@@ -57,44 +152,40 @@ class Api:
             return
         self.window.evaluate_js("setOut('Fetching...')")
 
-        def work():
-            try:
-                if scratchattach is None:
-                    out = 'scratchattach not available. Install requirements.'
-                else:
-                    user = scratchattach.get_user(username)
-                    ok = user.update()
-                    if not ok:
-                        out = f'Failed to fetch user: {ok}'
-                    else:
-                        data = {
-                            'id': getattr(user, 'id', None),
-                            'username': getattr(user, 'username', None),
-                            'about_me': getattr(user, 'about_me', None),
-                            'wiwo': getattr(user, 'wiwo', None),
-                            'country': getattr(user, 'country', None),
-                            'join_date': getattr(user, 'join_date', None),
-                        }
-                        out = json.dumps(data, indent=2)
-            except Exception as e:
-                out = f'Error: {e}'
+        def show(data, error):
+            if error is not None:
+                out = f'Error: {cli.describe_error(error) if cli else error}'
+            else:
+                out = json.dumps(data, indent=2)
             # send back to page
             try:
                 self.window.evaluate_js(f"setOut({json.dumps(out)})")
             except Exception:
                 pass
 
-        t = threading.Thread(target=work, daemon=True)
-        t.start()
+        self.pool.request(username, show)
 
 
 def main():
     if webview is None:
         print('pywebview not installed; run `pip install pywebview` or make install-local`')
         return
+    if cli is not None:
+        cli.configure_rate_limit(
+            float(os.environ.get('SCRATCH_RATE', 10)),
+            int(os.environ.get('SCRATCH_BURST', 20)),
+        )
+        cli.install_http_hooks()
+        # The pool threads share one set of kept-alive connections
+        cli.configure_http_pool()
+        # SCRATCH_RECORD / SCRATCH_REPLAY record or replay a cassette (see README)
+        cli.use_cassette()
     window = webview.create_window('Scratchattach', html=HTML, width=800, height=600)
     api = Api(window)
-    webview.start(func=None, gui='qt', http_server=False, debug=False, api=api)
+    try:
+        webview.start(func=None, gui='qt', http_server=False, debug=False, api=api)
+    finally:
+        api.pool.close()
 
 if __name__ == '__main__':
     main()
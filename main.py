@@ -2,92 +2,2953 @@ import sys
 import os
 import json
 import argparse
+import contextvars
+import random
+import textwrap
+import threading
+import time
+import warnings
+from collections import deque
+
+__version__ = "0.1.0"
+
+# Ensure packages installed into the workspace-local `.local-packages` are importable
+local_packages = os.path.join(os.getcwd(), '.local-packages')
+if local_packages not in sys.path:
+	sys.path.insert(0, local_packages)
+
+
+# Heavy and optional dependencies are imported on first use, so quick invocations
+# (--help, --version, --forget-session) never pay for scratchattach, rich or keyring.
+class _LazyModule:
+	"""Stand-in for a module that is imported on first attribute access."""
+
+	def __init__(self, name, on_load=None):
+		self._name = name
+		self._module = None
+		self._on_load = on_load
+
+	def _load(self):
+		if self._module is None:
+			import importlib
+			with span(f"import {self._name}", "import"):
+				self._module = importlib.import_module(self._name)
+			if self._on_load is not None:
+				self._on_load(self._module)
+		return self._module
+
+	def __getattr__(self, attr):
+		return getattr(self._load(), attr)
+
+
+def _on_scratchattach_load(module):
+	# HTTP hooks (rate limiting, retries, request accounting) and the pooled
+	# connection adapter go in as soon as scratchattach is loaded
+	install_http_hooks()
+	configure_http_pool()
+
+
+scratchattach = _LazyModule("scratchattach", on_load=_on_scratchattach_load)
+
+_optional_modules = {}
+
+
+def optional_import(name):
+	"""Import an optional dependency once; returns the module, or None when it is unavailable."""
+	if name not in _optional_modules:
+		try:
+			import importlib
+			_optional_modules[name] = importlib.import_module(name)
+		except Exception:
+			_optional_modules[name] = None
+	return _optional_modules[name]
+
+
+def have_keyring() -> bool:
+	return optional_import("keyring") is not None
+
+
+def have_rich() -> bool:
+	return optional_import("rich.console") is not None
+
+
+def load_env_file() -> bool:
+	"""Load environment variables from ./.env if python-dotenv is available."""
+	dotenv = optional_import("dotenv")
+	if dotenv is None:
+		return False
+	try:
+		return dotenv.load_dotenv(os.path.join(os.getcwd(), '.env'))
+	except Exception:
+		return False
+
+
+class RequestCounter:
+	"""Thread-safe tally of upstream HTTP requests made through scratchattach."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self.total = 0
+		self.by_host = {}
+
+	def record(self, method, url):
+		from urllib.parse import urlsplit
+		host = urlsplit(str(url)).netloc or "?"
+		with self._lock:
+			self.total += 1
+			self.by_host[host] = self.by_host.get(host, 0) + 1
+
+	def summary(self) -> str:
+		with self._lock:
+			hosts = ", ".join(f"{h}: {n}" for h, n in sorted(self.by_host.items()))
+			return f"{self.total} upstream request(s)" + (f" ({hosts})" if hosts else "")
+
+
+REQUEST_STATS = RequestCounter()
+
+
+class Timings:
+	"""Span recorder behind ``--timings`` / ``--trace``.
+
+	``spans`` holds ``(name, category, start, end, thread id)`` tuples (perf_counter
+	seconds); very frequent operations (one per record) are only summed in
+	``totals`` so large exports do not produce huge traces.
+	"""
+
+	def __init__(self):
+		self.origin = time.perf_counter()
+		self.spans = []
+		self.totals = {}
+		self._phase = None
+		self._lock = threading.Lock()
+
+	def record(self, name, category, start, end):
+		with self._lock:
+			self.spans.append((name, category, start, end, threading.get_ident()))
+
+	def add(self, name, seconds, count=1):
+		with self._lock:
+			total, n = self.totals.get(name, (0.0, 0))
+			self.totals[name] = (total + seconds, n + count)
+
+	def phase(self, name):
+		"""End the current top-level phase and start ``name`` (None just ends it)."""
+		now = time.perf_counter()
+		if self._phase is not None:
+			self.record(self._phase[0], "phase", self._phase[1], now)
+		self._phase = (name, now) if name else None
+
+	def summary(self) -> str:
+		"""Per-phase breakdown, then per-category totals of the finer spans."""
+		lines = []
+		wall = sum(end - start for _, cat, start, end, _ in self.spans if cat == "phase")
+		for name, cat, start, end, _ in self.spans:
+			if cat == "phase":
+				ms = (end - start) * 1000
+				lines.append(f"  {name:<24}{ms:>10.1f} ms{(end - start) / wall * 100 if wall else 0:>7.1f}%")
+		by_cat = {}
+		for name, cat, start, end, _ in self.spans:
+			if cat != "phase":
+				total, n = by_cat.get(cat, (0.0, 0))
+				by_cat[cat] = (total + end - start, n + 1)
+		for cat, (total, n) in sorted({**by_cat, **self.totals}.items()):
+			lines.append(f"  {cat + ' (x' + str(n) + ')':<24}{total * 1000:>10.1f} ms")
+		return "Timings:\n" + "\n".join(lines)
+
+	def chrome_trace(self) -> dict:
+		"""Trace Event Format (chrome://tracing, Perfetto, speedscope) as a JSON-ready dict."""
+		pid = os.getpid()
+		events = [
+			{"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+				"ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+			for name, cat, start, end, tid in self.spans
+		]
+		return {"traceEvents": events, "displayTimeUnit": "ms",
+			"otherData": {k: {"ms": round(t * 1000, 3), "count": n} for k, (t, n) in self.totals.items()}}
+
+
+class _Span:
+	def __init__(self, timings, name, category):
+		self.timings = timings
+		self.name = name
+		self.category = category
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc):
+		self.timings.record(self.name, self.category, self.start, time.perf_counter())
+		return False
+
+
+class _NoSpan:
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+
+_NO_SPAN = _NoSpan()
+
+# Active recorder, or None (the default) so instrumentation costs one global lookup
+TIMINGS = None
+
+
+def span(name, category="span"):
+	"""Context manager timing a block when --timings/--trace is on; a shared no-op otherwise."""
+	timings = TIMINGS
+	return _NO_SPAN if timings is None else _Span(timings, name, category)
+
+
+def phase(name):
+	"""Switch the top-level phase (config, session, command, ...) when timings are on."""
+	if TIMINGS is not None:
+		TIMINGS.phase(name)
+
+
+def enable_timings():
+	global TIMINGS
+	TIMINGS = Timings()
+	return TIMINGS
+
+
+class TokenBucket:
+	"""Thread-safe token-bucket rate limiter with adaptive slow-down.
+
+	``acquire()`` reserves a token and sleeps until it is due, so concurrent
+	callers are spaced evenly at ``rate`` requests/sec after an initial ``burst``.
+	``penalize()`` (on HTTP 429) cuts the current rate multiplicatively and
+	``reward()`` (on success) climbs back towards the configured rate in small
+	steps, which keeps throughput close to the upstream ceiling without swinging.
+	"""
+
+	MIN_RATE = 0.2
+
+	def __init__(self, rate=10.0, burst=20, clock=time.monotonic, sleep=time.sleep):
+		self.target_rate = float(rate)
+		self.rate = float(rate)
+		self.burst = max(1, int(burst))
+		self._tokens = float(self.burst)
+		self._clock = clock
+		self._sleep = sleep
+		self._last = clock()
+		self._lock = threading.Lock()
+		self.allowed = 0
+		self.delayed = 0
+		self.retried = 0
+		self.throttled = 0
+
+	def acquire(self) -> float:
+		"""Take one token, sleeping if none is available. Returns the seconds waited."""
+		with self._lock:
+			now = self._clock()
+			self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+			self._last = now
+			self._tokens -= 1
+			wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+			self.allowed += 1
+			if wait > 0:
+				self.delayed += 1
+		if wait > 0:
+			self._sleep(wait)
+		return wait
+
+	def penalize(self):
+		with self._lock:
+			self.throttled += 1
+			self.rate = max(self.MIN_RATE, self.rate * 0.7)
+
+	def note_retry(self):
+		with self._lock:
+			self.retried += 1
+
+	def reward(self):
+		if self.rate >= self.target_rate:
+			return
+		with self._lock:
+			self.rate = min(self.target_rate, self.rate + self.target_rate / 50.0)
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"allowed": self.allowed,
+				"delayed": self.delayed,
+				"retried": self.retried,
+				"throttled": self.throttled,
+				"rate": round(self.rate, 2),
+			}
+
+
+# Shared limiter applied to every upstream call (None disables throttling); see configure_rate_limit()
+RATE_LIMITER = None
+# Per-context override of RATE_LIMITER, so each `--profiles` job spends its own budget
+PROFILE_LIMITER = contextvars.ContextVar("PROFILE_LIMITER")
+# Retry policy for throttled (429) and server-error (5xx) responses and connection failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+
+def configure_rate_limit(rate=10.0, burst=20, retries=4):
+	"""Install the shared limiter (``rate`` <= 0 disables throttling) and the retry budget."""
+	global RATE_LIMITER, MAX_RETRIES
+	RATE_LIMITER = TokenBucket(rate, burst) if rate and rate > 0 else None
+	MAX_RETRIES = max(0, int(retries))
+	return RATE_LIMITER
+
+
+def backoff_delay(attempt: int, retry_after=None) -> float:
+	"""Full-jitter exponential backoff; a server-provided Retry-After wins when present."""
+	if retry_after:
+		try:
+			return min(BACKOFF_CAP, float(retry_after))
+		except (TypeError, ValueError):
+			pass
+	return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def describe_error(e) -> str:
+	"""Human-friendly message for errors raised by scratchattach/requests."""
+	name = type(e).__name__
+	if name == "Response429":
+		return f"rate-limited by Scratch (HTTP 429) after {MAX_RETRIES} retries"
+	if name == "APIError":
+		return f"Scratch server error: {e}"
+	if name == "UserNotFound":
+		return "user not found"
+	if name == "ProjectNotFound":
+		return "project not found"
+	if name in ("FetchError", "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout"):
+		return f"network error: {e}"
+	return str(e) or name
+
+
+def _is_transient(e) -> bool:
+	try:
+		from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+	except Exception:
+		return False
+	return isinstance(e, (RequestsConnectionError, Timeout))
+
+
+def install_http_hooks():
+	"""Wrap scratchattach's shared HTTP session so every upstream request is throttled, retried and counted.
+
+	Safe to call more than once. Returns False when the scratchattach internals are not available.
+	"""
+	try:
+		from scratchattach.utils.requests import requests as sa_requests
+	except Exception:
+		return False
+	# Always wrap the unhooked method so re-installing never stacks wrappers
+	original = getattr(sa_requests, "_helper_original", None) or sa_requests.request
+
+	def request(method, url, *args, **kwargs):
+		cassette = CASSETTE
+		if cassette is not None and cassette.mode == "replay":
+			# Served from the cassette: no throttling, retries or network
+			return cassette.play(method, url, kwargs)
+		attempt = 0
+		while True:
+			limiter = PROFILE_LIMITER.get(RATE_LIMITER)
+			if limiter is not None:
+				limiter.acquire()
+			REQUEST_STATS.record(method, url)
+			try:
+				with span(f"{method} {url}".split("?")[0], "http"):
+					resp = original(method, url, *args, **kwargs)
+			except Exception as e:
+				# Connection-level failures (DNS, reset, timeout) are retried like 5xx
+				if attempt >= MAX_RETRIES or not _is_transient(e):
+					raise
+				retry_after = None
+			else:
+				status = getattr(resp, "status_code", 200)
+				if status not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+					if limiter is not None and status != 429:
+						limiter.reward()
+					if cassette is not None:
+						cassette.record(method, url, kwargs, resp)
+					return resp
+				if limiter is not None and status == 429:
+					limiter.penalize()
+				retry_after = getattr(resp, "headers", {}).get("Retry-After")
+			if limiter is not None:
+				limiter.note_retry()
+			time.sleep(backoff_delay(attempt, retry_after))
+			attempt += 1
+
+	sa_requests._helper_original = original
+	sa_requests.request = request
+	return True
+
+
+# Connection pool settings for scratchattach's shared HTTP session; main() fills these from the CLI
+HTTP_POOL_SETTINGS = {"pool_size": 16, "keep_alive": True, "compress": True}
+HTTP_POOL = None
+
+
+def configure_http_pool(pool_size=None, keep_alive=None, compress=None):
+	"""Mount one pooled, keep-alive adapter on scratchattach's shared HTTP session.
+
+	Every fetch path (CLI workers, the GUI's threads, image downloads) goes
+	through that session, so connections and TLS handshakes are reused across
+	them. ``pool_size`` caps the kept-alive connections per host and should be
+	at least the number of concurrent workers; ``compress`` advertises every
+	encoding urllib3 can decode (gzip/deflate, plus br/zstd when installed).
+	Unset arguments come from ``HTTP_POOL_SETTINGS``. Returns the adapter, or
+	None when the scratchattach/requests internals are not available.
+	"""
+	global HTTP_POOL
+	settings = dict(HTTP_POOL_SETTINGS)
+	settings.update({k: v for k, v in (("pool_size", pool_size), ("keep_alive", keep_alive), ("compress", compress)) if v is not None})
+	try:
+		from requests.adapters import HTTPAdapter
+		from urllib3.util.request import ACCEPT_ENCODING
+		from scratchattach.utils.requests import requests as sa_requests
+		mount = sa_requests.mount
+	except Exception:
+		return None
+	# Retries are handled by the request hook; the adapter must not retry on its own
+	adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max(1, int(settings["pool_size"])), max_retries=0)
+	for prefix in ("https://", "http://"):
+		mount(prefix, adapter)
+	sa_requests.headers["Connection"] = "keep-alive" if settings["keep_alive"] else "close"
+	sa_requests.headers["Accept-Encoding"] = ACCEPT_ENCODING if settings["compress"] else "identity"
+	if HTTP_POOL is not None:
+		HTTP_POOL.close()
+	HTTP_POOL = adapter
+	return adapter
+
+
+def connection_stats() -> dict:
+	"""Requests and new connections per host in the shared pool (``reused`` = requests without a new connection)."""
+	stats = {"requests": 0, "connections": 0, "reused": 0, "hosts": {}}
+	if HTTP_POOL is None:
+		return stats
+	pools = HTTP_POOL.poolmanager.pools
+	for key in pools.keys():
+		pool = pools.get(key)
+		if pool is None:
+			continue
+		host = getattr(pool, "host", None) or str(key)
+		requests_made, connections = pool.num_requests, pool.num_connections
+		stats["hosts"][host] = {"requests": requests_made, "connections": connections}
+		stats["requests"] += requests_made
+		stats["connections"] += connections
+	stats["reused"] = max(0, stats["requests"] - stats["connections"])
+	return stats
+
+
+class CassetteMiss(LookupError):
+	"""A replayed run asked for a request the cassette never recorded."""
+
+
+class Cassette:
+	"""Recorded upstream responses for ``--record`` / ``--replay``.
+
+	The file is append-only: each entry is a 4-byte key length, a 4-byte body
+	length, the key (``METHOD URL`` plus a hash of any request body) and a
+	zlib-compressed JSON response. Replaying reads the file once and indexes
+	entries by key; payloads are decompressed on first use. Repeated requests
+	are answered in the recorded order, and the last answer is then reused.
+	"""
+
+	# Response headers worth keeping; bodies are stored decoded, so encoding/length headers are not
+	KEEP_HEADERS = ("content-type", "etag", "last-modified", "retry-after", "location")
+
+	def __init__(self, path, mode="replay"):
+		self.path = os.path.expanduser(path)
+		self.mode = mode
+		self.hits = 0
+		self._lock = threading.Lock()
+		self._index = {}
+		self._served = {}
+		self._decoded = {}
+		self._out = None
+		if mode == "replay":
+			with open(self.path, "rb") as f:
+				self._data = f.read()
+			self._build_index()
+		else:
+			self._out = open(self.path, "ab")
+
+	@staticmethod
+	def key(method, url, kwargs) -> str:
+		import hashlib
+		from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+		parts = urlsplit(str(url))
+		# scratchattach adds random cache-busting parameters; they must not change the key
+		query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "cachebust"))
+		key = f"{str(method).upper()} {urlunsplit(parts._replace(query=query, fragment=''))}"
+		body = kwargs.get("data") if kwargs.get("json") is None else json.dumps(kwargs["json"], sort_keys=True)
+		if body:
+			key += " " + hashlib.sha256(body if isinstance(body, bytes) else str(body).encode("utf-8")).hexdigest()[:16]
+		return key
+
+	def _build_index(self):
+		import struct
+		data, pos = self._data, 0
+		while pos + 8 <= len(data):
+			key_len, body_len = struct.unpack_from(">II", data, pos)
+			end = pos + 8 + key_len + body_len
+			if end > len(data):
+				break  # torn final entry from an interrupted recording
+			key = data[pos + 8:pos + 8 + key_len].decode("utf-8")
+			self._index.setdefault(key, []).append((pos + 8 + key_len, body_len))
+			pos = end
+
+	def __len__(self):
+		return sum(len(v) for v in self._index.values())
+
+	def play(self, method, url, kwargs):
+		"""The recorded response for this request; raises CassetteMiss when there is none."""
+		import zlib
+		key = self.key(method, url, kwargs)
+		with self._lock:
+			entries = self._index.get(key)
+			if not entries:
+				raise CassetteMiss(f"not in cassette {self.path}: {key}")
+			n = self._served.get(key, 0)
+			self._served[key] = n + 1
+			entry = entries[min(n, len(entries) - 1)]
+			payload = self._decoded.get(entry)
+			if payload is None:
+				offset, length = entry
+				payload = json.loads(zlib.decompress(self._data[offset:offset + length]).decode("utf-8"))
+				self._decoded[entry] = payload
+			self.hits += 1
+		return self._response(url, payload)
+
+	@staticmethod
+	def _response(url, payload):
+		import base64
+		from requests.models import Response
+		from requests.structures import CaseInsensitiveDict
+		resp = Response()
+		resp.status_code = payload["status"]
+		resp.url = str(url)
+		resp.headers = CaseInsensitiveDict(payload.get("headers") or {})
+		resp.encoding = payload.get("encoding")
+		resp._content = base64.b64decode(payload["body"])
+		resp._content_consumed = True
+		return resp
+
+	def record(self, method, url, kwargs, resp):
+		"""Append ``resp`` (its body is read here) under this request's key."""
+		import base64
+		import struct
+		import zlib
+		headers = getattr(resp, "headers", None) or {}
+		payload = {
+			"status": getattr(resp, "status_code", 200),
+			"headers": {k: v for k, v in headers.items() if k.lower() in self.KEEP_HEADERS},
+			"encoding": getattr(resp, "encoding", None),
+			"body": base64.b64encode(resp.content or b"").decode("ascii"),
+		}
+		key = self.key(method, url, kwargs).encode("utf-8")
+		body = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), 6)
+		with self._lock:
+			self._out.write(struct.pack(">II", len(key), len(body)) + key + body)
+			self._out.flush()
+
+	def close(self):
+		if self._out is not None:
+			self._out.close()
+
+
+# Active cassette (None: talk to Scratch); see use_cassette()
+CASSETTE = None
+
+
+def use_cassette(record=None, replay=None):
+	"""Record upstream responses to ``record`` or serve them from ``replay`` (a cassette file).
+
+	Without arguments the SCRATCH_RECORD / SCRATCH_REPLAY environment variables
+	are used, which is how the GUI is put into record or replay mode.
+	"""
+	global CASSETTE
+	if record is None and replay is None:
+		record, replay = os.environ.get("SCRATCH_RECORD"), os.environ.get("SCRATCH_REPLAY")
+	if replay:
+		CASSETTE = Cassette(replay, "replay")
+	elif record:
+		CASSETTE = Cassette(record, "record")
+	return CASSETTE
+
+
+def load_user(username: str, session=None):
+	"""Return an updated scratchattach User using a single profile request.
+
+	``get_user``/``connect_user`` already run ``update()`` internally, so calling
+	``update()`` again on their result doubles the round-trips; build the object
+	directly instead (linked to ``session`` when given).
+	"""
+	user = scratchattach.User(username=username, _session=session)
+	ok = user.update()
+	if ok == "429":
+		raise RuntimeError("Rate-limited by Scratch (HTTP 429); try again later")
+	if not ok:
+		raise RuntimeError(f"Failed to fetch data for user '{username}': {ok}")
+	return user
+
+
+def user_to_dict(user) -> dict:
+	"""Build the public profile dict from an already-updated scratchattach User."""
+	return {
+		"id": getattr(user, "id", None),
+		"username": getattr(user, "username", None),
+		"about_me": getattr(user, "about_me", None),
+		"wiwo": getattr(user, "wiwo", None),
+		"country": getattr(user, "country", None),
+		"icon_url": getattr(user, "icon_url", None),
+		"join_date": getattr(user, "join_date", None),
+		"scratchteam": getattr(user, "scratchteam", None),
+	}
+
+
+def fetch_user_data(username: str, session=None) -> dict:
+	"""Fetch basic public data for a Scratch username using scratchattach."""
+	return user_to_dict(load_user(username, session=session))
+
+
+# Fields produced by user_to_dict(); used as the stable column order for bulk output
+USER_FIELDS = ["id", "username", "about_me", "wiwo", "country", "icon_url", "join_date", "scratchteam"]
+
+# Fields kept from scratchattach Project objects (JSON-safe, cacheable)
+PROJECT_FIELDS = [
+	"id", "title", "author_name", "created", "last_modified", "share_date", "views", "loves",
+	"favorites", "remix_count", "remix_parent", "remix_root", "comments_allowed", "thumbnail_url",
+]
+
+
+# Extra fields only the per-project endpoint returns (`projects --details`)
+PROJECT_DETAIL_FIELDS = PROJECT_FIELDS + ["instructions", "notes"]
+
+
+def fetch_project_detail(project_id, session=None) -> dict:
+	"""One project's full record (stats, instructions, notes) from the project endpoint."""
+	project = scratchattach.Project(id=int(project_id), _session=session)
+	ok = project.update()
+	if ok is False:
+		raise RuntimeError(f"project {project_id} not available")
+	return {k: getattr(project, k, None) for k in PROJECT_DETAIL_FIELDS}
+
+
+def enrich_projects(projects, fetch_detail, workers=8):
+	"""Merge ``fetch_detail(id)`` into each streamed project record, looking details up concurrently.
+
+	Records keep their order; at most ``workers * 2`` lookups are in flight,
+	so the input is consumed lazily. Detail values win over the listing's
+	unless they are None; a failed lookup adds ``detail_error`` instead.
+	"""
+	from concurrent.futures import ThreadPoolExecutor
+	workers = max(1, int(workers or 1))
+	window = deque()
+	records = iter(projects)
+	with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="details") as pool:
+		try:
+			while True:
+				while len(window) < workers * 2:
+					record = next(records, None)
+					if record is None:
+						break
+					pid = record.get("id")
+					window.append((record, pool.submit(fetch_detail, pid) if pid is not None else None))
+				if not window:
+					break
+				record, future = window.popleft()
+				if future is None:
+					yield record
+					continue
+				try:
+					detail = future.result()
+				except Exception as e:
+					yield {**record, "detail_error": describe_error(e)}
+					continue
+				yield {**record, **{k: v for k, v in detail.items() if v is not None}}
+		finally:
+			for _, future in window:
+				if future is not None:
+					future.cancel()
+
+
+def project_to_dict(p) -> dict:
+	"""Convert a scratchattach Project (or an already plain dict) into a JSON-safe dict."""
+	if isinstance(p, dict):
+		return p
+	return {k: getattr(p, k, None) for k in PROJECT_FIELDS}
+
+
+def message_to_dict(m) -> dict:
+	"""Convert a scratchattach Activity/message into a JSON-safe dict (the raw API payload when available)."""
+	if isinstance(m, dict):
+		return m
+	raw = getattr(m, "raw", None)
+	if isinstance(raw, dict):
+		return dict(raw)
+	return {"text": str(m)}
+
+
+MESSAGES_PAGE_SIZE = 40
+
+
+def message_id(m: dict):
+	"""Numeric id of a message dict (ids grow over time), or None."""
+	try:
+		return int(m.get("id"))
+	except (TypeError, ValueError):
+		return None
+
+
+def iter_messages(fetch_page, since=None, limit=None):
+	"""Lazily yield message dicts newest first, one API page at a time.
+
+	Stops at the first message whose id is ``since`` or older (already seen)
+	and after ``limit`` messages, so neither requests more pages than needed.
+	``fetch_page(offset)`` returns the page starting at ``offset``.
+	"""
+	remaining = limit if limit and limit > 0 else None
+	offset = 0
+	while remaining is None or remaining > 0:
+		page = fetch_page(offset) or []
+		for m in page:
+			if since is not None and (message_id(m) or 0) <= since:
+				return
+			yield m
+			if remaining is not None:
+				remaining -= 1
+				if not remaining:
+					return
+		if len(page) < MESSAGES_PAGE_SIZE:
+			break
+		offset += len(page)
+
+
+# Per-account `messages` cursor: the newest message id already shown, plus the
+# unshown gap left when --limit cut a run short
+MESSAGE_CURSOR_FILE = "~/.scratchattach/message_cursors.json"
+
+
+def _cursor_state(value) -> dict:
+	if isinstance(value, dict):
+		return {"since": value.get("since"), "before": value.get("before"), "newest": value.get("newest")}
+	return {"since": value, "before": None, "newest": None}
+
+
+def read_message_cursor(account, path=MESSAGE_CURSOR_FILE) -> dict:
+	"""``{"since", "before", "newest"}`` for ``account``.
+
+	Every message up to ``since`` was shown. When ``before`` is set, a previous
+	run stopped at ``--limit``: messages older than ``before`` (and newer than
+	``since``) are still unseen, and ``newest`` becomes the cursor once they are.
+	"""
+	try:
+		with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+			return _cursor_state(json.load(f).get(account.lower()))
+	except Exception:
+		return _cursor_state(None)
+
+
+def save_message_cursor(account, since, path=MESSAGE_CURSOR_FILE, before=None, newest=None):
+	"""Store ``account``'s cursor (``since`` never moves backwards); safe for parallel runs."""
+	path = os.path.expanduser(path)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with file_lock(path):
+		try:
+			with open(path, "r", encoding="utf-8") as f:
+				cursors = json.load(f)
+		except Exception:
+			cursors = {}
+		key = account.lower()
+		current = _cursor_state(cursors.get(key))["since"]
+		if current is not None and (since is None or since < current):
+			return
+		cursors[key] = since if before is None else {"since": since, "before": before, "newest": newest}
+		write_json_file(path, cursors)
+
+
+def message_summary(m: dict) -> str:
+	"""One-line human description of a message dict."""
+	if m.get("subject"):
+		return str(m["subject"])
+	if m.get("type"):
+		parts = [str(m["type"])]
+		if m.get("actor_username"):
+			parts.append(f"from {m['actor_username']}")
+		title = m.get("project_title") or m.get("title") or m.get("comment_fragment")
+		if title:
+			parts.append(f"- {title}")
+		return " ".join(parts)
+	return m.get("text") or json.dumps(m, default=str)
+
+
+class _CacheBase:
+	"""Shared ``get_or_fetch`` for the cache classes (which provide ``get``/``set``)."""
+
+	def get_or_fetch(self, kind, key, fetch):
+		"""Return the cached value for (kind, key), calling ``fetch()`` and storing its result on a miss."""
+		value = self.get(kind, key)
+		if value is None:
+			value = fetch()
+			if value is not None:
+				self.set(kind, key, value)
+		return value
+
+
+class ResponseCache(_CacheBase):
+	"""Persistent SQLite cache for fetched records, keyed by entity type and id.
+
+	Each type has its own TTL (seconds). Entries carry a last-access timestamp and
+	the least recently used ones are evicted once the cache grows past ``max_entries``.
+	With ``refresh=True`` reads always miss but fresh results are still stored.
+	"""
+
+	DEFAULT_PATH = "~/.scratchattach/cache.sqlite"
+	DEFAULT_TTLS = {"user": 3600, "projects": 900, "project": 900, "messages": 60}
+	EVICT_EVERY = 64
+
+	def __init__(self, path=None, ttls=None, max_entries=10000, refresh=False):
+		import sqlite3
+		self.path = os.path.expanduser(path or self.DEFAULT_PATH)
+		self.ttls = dict(self.DEFAULT_TTLS)
+		self.ttls.update(ttls or {})
+		self.max_entries = max_entries
+		self.refresh = refresh
+		self.hits = 0
+		self.misses = 0
+		self._writes = 0
+		self._lock = threading.Lock()
+		if self.path != ":memory:":
+			os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+		self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+		self._db.execute("PRAGMA journal_mode=WAL")
+		self._db.execute(
+			"CREATE TABLE IF NOT EXISTS entries ("
+			"kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+			"stored_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (kind, key))"
+		)
+		self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+		self._evict()
+
+	def get(self, kind, key):
+		"""Return the cached value, or None when missing, expired or refreshing."""
+		now = time.time()
+		with self._lock:
+			if self.refresh:
+				self.misses += 1
+				return None
+			row = self._db.execute(
+				"SELECT value, stored_at FROM entries WHERE kind = ? AND key = ?", (kind, str(key))
+			).fetchone()
+			if row is None or now - row[1] > self.ttls.get(kind, 0):
+				self.misses += 1
+				return None
+			self._db.execute("UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?", (now, kind, str(key)))
+			self.hits += 1
+		return json.loads(row[0])
+
+	def set(self, kind, key, value):
+		now = time.time()
+		with self._lock:
+			self._db.execute(
+				"INSERT OR REPLACE INTO entries (kind, key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+				(kind, str(key), json.dumps(value, default=str), now, now),
+			)
+			self._writes += 1
+			if self._writes % self.EVICT_EVERY == 0:
+				self._evict()
+
+	def _evict(self):
+		# Keep the `max_entries` most recently used rows; callers hold the lock (or own the connection)
+		self._db.execute(
+			"DELETE FROM entries WHERE rowid IN ("
+			"SELECT rowid FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+			(int(self.max_entries),),
+		)
+
+	def clear(self):
+		with self._lock:
+			self._db.execute("DELETE FROM entries")
+
+	def close(self):
+		with self._lock:
+			self._evict()
+			self._db.close()
+
+
+PROJECTS_PAGE_SIZE = 40
+
+
+def iter_user_projects(username: str, limit=None, session=None, fetch_page=None, offset=0):
+	"""Lazily yield a user's projects as dicts, one API page at a time.
+
+	Pages are requested only while more projects are needed, so ``limit`` stops
+	the crawl early and an unlimited listing never holds more than one page.
+	``fetch_page(offset)`` returns the page starting at ``offset`` (hook for caching).
+	``offset`` skips that many projects (a resumed listing); ``limit`` counts from there.
+	"""
+	if fetch_page is None:
+		user = scratchattach.User(username=username, _session=session)
+
+		def fetch_page(offset):
+			return [project_to_dict(p) for p in user.projects(limit=PROJECTS_PAGE_SIZE, offset=offset)]
+
+	remaining = limit if limit and limit > 0 else None
+	offset = max(0, int(offset or 0))
+	while remaining is None or remaining > 0:
+		page = fetch_page(offset) or []
+		for p in page[:remaining]:
+			yield p
+		if remaining is not None:
+			remaining -= min(len(page), remaining)
+		if len(page) < PROJECTS_PAGE_SIZE:
+			break
+		offset += len(page)
+
+
+# Formats chosen from the --export extension when --format is not given
+EXPORT_FORMATS = {
+	".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson",
+	".yaml": "yaml", ".yml": "yaml", ".csv": "csv",
+	".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow",
+}
+
+
+def resolve_format(fmt=None, export_path=None, default=None):
+	"""Return the explicit format, else one inferred from the export file extension, else ``default``."""
+	if fmt:
+		return fmt
+	if export_path:
+		return EXPORT_FORMATS.get(os.path.splitext(export_path)[1].lower(), default)
+	return default
+
+
+class RecordWriter:
+	"""Streaming writer: ``write()`` each record as it arrives, then ``close()``.
+
+	Writers never collect the records they are given, so memory stays flat no
+	matter how many records pass through. ``envelope`` wraps the stream in a
+	mapping whose last key holds the records (e.g. ``{"username": u, "projects": None}``);
+	formats that cannot express it (NDJSON, CSV) ignore it.
+	"""
+
+	# Formats whose files can be extended by appending more records
+	appendable = False
+
+	def __init__(self, out, envelope=None, fieldnames=None, close_out=False, append=False):
+		self.out = out
+		self.envelope = envelope
+		self.fieldnames = list(fieldnames) if fieldnames else None
+		self.count = 0
+		self._close_out = close_out
+		# Appending to existing output: no headers/preamble are written again
+		self.append = append
+
+	def write(self, record):
+		timings = TIMINGS
+		if timings is None:
+			self._write(record)
+		else:
+			start = time.perf_counter()
+			self._write(record)
+			timings.add("serialize", time.perf_counter() - start)
+		self.count += 1
+
+	def write_many(self, records) -> int:
+		for record in records:
+			self.write(record)
+		return self.count
+
+	def flush(self):
+		self.out.flush()
+
+	def close(self):
+		self._finish()
+		if self._close_out:
+			self.out.close()
+		else:
+			self.out.flush()
+
+	def _write(self, record):
+		raise NotImplementedError
+
+	def _finish(self):
+		pass
+
+	def _split_envelope(self):
+		items = list((self.envelope or {}).items())
+		if not items:
+			return [], None
+		return items[:-1], items[-1][0]
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+class NDJSONWriter(RecordWriter):
+	"""One compact JSON object per line."""
+
+	appendable = True
+
+	def _write(self, record):
+		self.out.write(json.dumps(record, default=str) + "\n")
+
+
+class JSONWriter(RecordWriter):
+	"""A JSON array (optionally inside the envelope object) written item by item."""
+
+	def _write(self, record):
+		if not self.count:
+			head, list_key = self._split_envelope()
+			if list_key is None:
+				self.out.write("[")
+			else:
+				self.out.write("{\n")
+				for k, v in head:
+					self.out.write(f"  {json.dumps(k)}: {json.dumps(v, default=str)},\n")
+				self.out.write(f"  {json.dumps(list_key)}: [")
+		self.out.write(("," if self.count else "") + "\n    " + json.dumps(record, default=str))
+
+	def _finish(self):
+		head, list_key = self._split_envelope()
+		if not self.count:
+			if list_key is None:
+				self.out.write("[]\n")
+			else:
+				self.out.write(json.dumps({**dict(head), list_key: []}, indent=2, default=str) + "\n")
+			return
+		self.out.write("\n]\n" if list_key is None else "\n  ]\n}\n")
+
+
+class YAMLWriter(RecordWriter):
+	"""A YAML sequence (optionally under the envelope mapping) written entry by entry."""
+
+	def __init__(self, *args, **kwargs):
+		import yaml
+		super().__init__(*args, **kwargs)
+		self._yaml = yaml
+
+	def _write(self, record):
+		if not self.count:
+			head, list_key = self._split_envelope()
+			if head:
+				self.out.write(self._yaml.safe_dump(dict(head), sort_keys=False))
+			if list_key is not None:
+				self.out.write(f"{list_key}:\n")
+		self.out.write(self._yaml.safe_dump([record], sort_keys=False))
+
+	def _finish(self):
+		if not self.count:
+			head, list_key = self._split_envelope()
+			empty = {**dict(head), list_key: []} if list_key is not None else []
+			self.out.write(self._yaml.safe_dump(empty, sort_keys=False))
+
+
+class CSVWriter(RecordWriter):
+	"""Incremental CSV with a stable column order.
+
+	Columns are the declared ``fieldnames``, or else the keys of the first
+	``schema_batch`` records in first-seen order; keys that only show up later
+	are dropped rather than reshaping the file. Nested values are JSON-encoded.
+	"""
+
+	appendable = True
+
+	def __init__(self, *args, schema_batch=100, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.schema_batch = schema_batch
+		self._pending = []
+		self._writer = None
+
+	def _start(self):
+		import csv
+		if self.fieldnames is None:
+			self.fieldnames = list(dict.fromkeys(k for r in self._pending for k in r))
+		self._writer = csv.DictWriter(self.out, fieldnames=self.fieldnames, extrasaction="ignore")
+		if not self.append:
+			self._writer.writeheader()
+		pending, self._pending = self._pending, []
+		for r in pending:
+			self._writer.writerow(self._row(r))
+
+	@staticmethod
+	def _row(record):
+		return {k: json.dumps(v, default=str) if isinstance(v, (dict, list)) else v for k, v in record.items()}
+
+	def _write(self, record):
+		if self._writer is not None:
+			self._writer.writerow(self._row(record))
+			return
+		self._pending.append(record)
+		if self.fieldnames is not None or len(self._pending) >= self.schema_batch:
+			self._start()
+
+	def _finish(self):
+		if self._writer is None:
+			self._start()
+
+
+# Column types for the columnar writers; other fields are stored as strings
+COLUMN_TYPES = {
+	"id": "int64", "views": "int64", "loves": "int64", "favorites": "int64", "remix_count": "int64",
+	"remix_parent": "int64", "remix_root": "int64", "message_count": "int64",
+	"scratchteam": "bool", "comments_allowed": "bool", "authenticated_view": "bool",
+	"sprites": "int64", "blocks": "int64", "scripts": "int64", "unique_opcodes": "int64", "costumes": "int64",
+	"sounds": "int64", "unique_assets": "int64", "variables": "int64", "lists": "int64", "json_bytes": "int64",
+	"sound_seconds": "float64",
+	"join_date": "timestamp", "created": "timestamp", "last_modified": "timestamp", "share_date": "timestamp",
+}
+
+
+class ColumnarWriter(RecordWriter):
+	"""Typed columnar output (Parquet or Arrow IPC) written one row group at a time.
+
+	The schema comes from the declared ``fieldnames`` (else the keys of the
+	first row group) with types from ``COLUMN_TYPES``; values that do not fit
+	their column become nulls and nested values are JSON-encoded. Only
+	``row_group_size`` rows are buffered at once. Needs pyarrow.
+	"""
+
+	binary = True
+
+	def __init__(self, *args, row_group_size=10000, **kwargs):
+		import pyarrow
+		super().__init__(*args, **kwargs)
+		self._pa = pyarrow
+		self.row_group_size = max(1, int(row_group_size))
+		self._rows = []
+		self._schema = None
+		self._sink = None
+
+	def _column_type(self, name):
+		pa = self._pa
+		kind = COLUMN_TYPES.get(name)
+		if kind == "int64":
+			return pa.int64()
+		if kind == "bool":
+			return pa.bool_()
+		if kind == "float64":
+			return pa.float64()
+		if kind == "timestamp":
+			return pa.timestamp("ms", tz="UTC")
+		return pa.string()
+
+	@staticmethod
+	def _convert(kind, value):
+		if value is None:
+			return None
+		try:
+			if kind == "int64":
+				return int(value)
+			if kind == "float64":
+				return float(value)
+			if kind == "bool":
+				return value.lower() in ("1", "true", "yes") if isinstance(value, str) else bool(value)
+			if kind == "timestamp":
+				from datetime import datetime, timezone
+				if not isinstance(value, datetime):
+					value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+				return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+		except (TypeError, ValueError):
+			return None
+		if kind is None:
+			return json.dumps(value, default=str) if isinstance(value, (dict, list)) else str(value)
+		return value
+
+	def _write(self, record):
+		self._rows.append(record)
+		if len(self._rows) >= self.row_group_size:
+			self._write_group()
+
+	def _write_group(self):
+		pa = self._pa
+		if self._schema is None:
+			names = self.fieldnames or list(dict.fromkeys(k for r in self._rows for k in r))
+			self._schema = pa.schema([(name, self._column_type(name)) for name in names])
+			self._sink = self._open_sink(self._schema)
+		columns = [
+			pa.array([self._convert(COLUMN_TYPES.get(f.name), r.get(f.name)) for r in self._rows], type=f.type)
+			for f in self._schema
+		]
+		self._rows = []
+		self._write_batch(pa.RecordBatch.from_arrays(columns, schema=self._schema))
+
+	def flush(self):
+		# Rows reach the file a whole row group at a time
+		pass
+
+	def _finish(self):
+		if self._rows or self._schema is None:
+			self._write_group()
+		self._sink.close()
+
+	def _open_sink(self, schema):
+		raise NotImplementedError
+
+	def _write_batch(self, batch):
+		raise NotImplementedError
+
+
+class ParquetWriter(ColumnarWriter):
+	"""Apache Parquet; each row group becomes one Parquet row group."""
+
+	def _open_sink(self, schema):
+		import pyarrow.parquet
+		return pyarrow.parquet.ParquetWriter(self.out, schema, compression="zstd")
+
+	def _write_batch(self, batch):
+		self._sink.write_table(self._pa.Table.from_batches([batch]), row_group_size=self.row_group_size)
+
+
+class ArrowWriter(ColumnarWriter):
+	"""Arrow IPC file (Feather v2), one record batch per row group."""
+
+	def _open_sink(self, schema):
+		return self._pa.ipc.new_file(self.out, schema)
+
+	def _write_batch(self, batch):
+		self._sink.write_batch(batch)
+
+
+WRITERS = {
+	"json": JSONWriter, "ndjson": NDJSONWriter, "yaml": YAMLWriter, "csv": CSVWriter,
+	"parquet": ParquetWriter, "arrow": ArrowWriter,
+}
+
+
+def open_writer(fmt, export_path=None, envelope=None, fieldnames=None, mode="w"):
+	"""Create the streaming writer for ``fmt`` on ``export_path`` (stdout when None).
+
+	``mode="a"`` continues an existing export; only NDJSON and CSV support it.
+	"""
+	cls = WRITERS[fmt]
+	if cls is YAMLWriter:
+		try:
+			import yaml  # noqa: F401
+		except Exception:
+			raise RuntimeError("PyYAML not installed; install 'pyyaml' to use YAML output")
+	binary = getattr(cls, "binary", False)
+	if binary:
+		if optional_import("pyarrow") is None:
+			raise RuntimeError(f"pyarrow not installed; install 'pyarrow' to use {fmt.upper()} output")
+		if not export_path:
+			raise RuntimeError(f"{fmt.upper()} output is binary; use --export FILE")
+	append = mode == "a" and bool(export_path) and os.path.exists(export_path) and os.path.getsize(export_path) > 0
+	if append and not cls.appendable:
+		raise RuntimeError(f"Cannot append to an existing {fmt.upper()} export; use NDJSON or CSV")
+	if binary:
+		out = open(export_path, "wb")
+	else:
+		out = open(export_path, mode, newline="", encoding="utf-8") if export_path else sys.stdout
+	try:
+		return cls(out, envelope=envelope, fieldnames=fieldnames, close_out=bool(export_path), append=append)
+	except Exception:
+		if export_path:
+			out.close()
+		raise
+
+
+class MemoryCache(_CacheBase):
+	"""In-process LRU cache with the same interface and TTL semantics as ResponseCache."""
+
+	def __init__(self, max_entries=1000, ttls=None):
+		from collections import OrderedDict
+		self.max_entries = max_entries
+		self.ttls = dict(ResponseCache.DEFAULT_TTLS)
+		self.ttls.update(ttls or {})
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, kind, key):
+		with self._lock:
+			entry = self._entries.get((kind, key))
+			if entry is None or time.time() - entry[1] > self.ttls.get(kind, 0):
+				self.misses += 1
+				return None
+			self._entries.move_to_end((kind, key))
+			self.hits += 1
+			return entry[0]
+
+	def set(self, kind, key, value):
+		with self._lock:
+			self._entries[(kind, key)] = (value, time.time())
+			self._entries.move_to_end((kind, key))
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+
+class TieredCache(_CacheBase):
+	"""Memory cache in front of a persistent one: reads fall through, writes go to both."""
+
+	def __init__(self, front, back=None):
+		self.front = front
+		self.back = back
+
+	def get(self, kind, key):
+		value = self.front.get(kind, key)
+		if value is None and self.back is not None:
+			value = self.back.get(kind, key)
+			if value is not None:
+				self.front.set(kind, key, value)
+		return value
+
+	def set(self, kind, key, value):
+		self.front.set(kind, key, value)
+		if self.back is not None:
+			self.back.set(kind, key, value)
+
+
+# Saved login: session string/id plus when it was last validated upstream
+SESSION_FILE = "~/.scratchattach_session"
+# A validated session is trusted for this long before it is checked again
+SESSION_TTL = 12 * 3600
+
+
+class file_lock:
+	"""Exclusive advisory lock on ``<path>.lock`` so parallel runs can share one state file."""
+
+	def __init__(self, path, timeout=10.0):
+		self.path = os.path.expanduser(path) + ".lock"
+		self.timeout = timeout
+		self._fd = None
+
+	def __enter__(self):
+		self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+		deadline = time.monotonic() + self.timeout
+		while True:
+			try:
+				if os.name == "nt":
+					import msvcrt
+					msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+				else:
+					import fcntl
+					fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+				return self
+			except OSError:
+				if time.monotonic() >= deadline:
+					os.close(self._fd)
+					self._fd = None
+					raise TimeoutError(f"Timed out waiting for {self.path}")
+				time.sleep(0.05)
+
+	def __exit__(self, *exc):
+		try:
+			if os.name == "nt":
+				import msvcrt
+				msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+			else:
+				import fcntl
+				fcntl.flock(self._fd, fcntl.LOCK_UN)
+		finally:
+			os.close(self._fd)
+			self._fd = None
+		return False
+
+
+class session_lock(file_lock):
+	"""``file_lock`` on the saved-session file."""
+
+	def __init__(self, path=SESSION_FILE, timeout=10.0):
+		super().__init__(path, timeout)
+
+
+def write_json_file(path, data):
+	"""Write ``data`` as JSON (mode 0600) via write-then-rename so readers never see a half-written file."""
+	path = os.path.expanduser(path)
+	tmp = f"{path}.{os.getpid()}.tmp"
+	fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(fd, "w", encoding="utf-8") as f:
+		json.dump(data, f)
+	os.replace(tmp, path)
+
+
+def read_session_file(path=SESSION_FILE) -> dict:
+	"""Saved session info, or an empty dict when missing or unreadable."""
+	try:
+		with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+			data = json.load(f)
+		return data if isinstance(data, dict) else {}
+	except Exception:
+		return {}
+
+
+def _write_session_file(path, info):
+	write_json_file(path, info)
+
+
+def session_info(ses) -> dict:
+	"""Identifying fields of a scratchattach session (string preferred, else id + username)."""
+	info = {}
+	if getattr(ses, "session_string", None):
+		info["session_string"] = ses.session_string
+	if getattr(ses, "id", None):
+		info["session_id"] = ses.id
+	if getattr(ses, "username", None):
+		info["username"] = ses.username
+	return info
+
+
+def _same_session(info, ses) -> bool:
+	current = session_info(ses)
+	for key in ("session_string", "session_id"):
+		if current.get(key) and info.get(key) == current[key]:
+			return True
+	return False
+
+
+def session_is_fresh(info, ses=None) -> bool:
+	"""True if ``info`` (the saved file) records an unexpired validation of ``ses``."""
+	if ses is not None and not _same_session(info, ses):
+		return False
+	return (info.get("expires_at") or 0) > time.time()
+
+
+def save_session_info(ses, validated_at=None, path=SESSION_FILE) -> bool:
+	"""Persist ``ses`` with its validation timestamps; returns True if the file changed.
+
+	An already-saved session keeps its recorded validation unless ``validated_at``
+	is given, so routine runs neither rewrite the file nor extend its expiry.
+	"""
+	with session_lock(path):
+		current = read_session_file(path)
+		info = session_info(ses)
+		if validated_at is None and _same_session(current, ses):
+			validated_at = current.get("validated_at")
+		if validated_at:
+			info["validated_at"] = validated_at
+			info["expires_at"] = validated_at + SESSION_TTL
+		if info == current:
+			return False
+		_write_session_file(path, info)
+	return True
+
+
+def save_session_keyring(session_string) -> bool:
+	"""Store the session string in the system keyring (when keyring is installed)."""
+	if not have_keyring():
+		return False
+	try:
+		optional_import("keyring").set_password("scratchattach", "session", session_string)
+		return True
+	except Exception:
+		return False
+
+
+class SessionExpired(RuntimeError):
+	"""Raised when a saved session is rejected upstream and a new login is needed."""
+
+
+def refresh_session(ses):
+	"""Check ``ses`` upstream (``refresh()`` when available, else a session ``update()``)."""
+	if hasattr(ses, "refresh"):
+		ses.refresh()
+		return
+	result = ses.update()
+	if result == "429":
+		raise RuntimeError("Rate limited while validating session (HTTP 429)")
+	if not result:
+		raise SessionExpired("Saved session is no longer valid; log in again")
+
+
+def ensure_fresh_session(ses, path=SESSION_FILE, force=False):
+	"""Validate ``ses`` only if its saved validation expired (or ``force``); returns the validation time.
+
+	The check and the refresh happen under the session lock, so when several
+	workers start at once only the first one refreshes and the rest reuse it.
+	Sessions without a ``refresh()`` method are not checked proactively (that
+	would cost a POST /session); ``LocalBackend.authed`` re-validates them when
+	a request actually fails authentication.
+	"""
+	info = read_session_file(path)
+	if not force and session_is_fresh(info, ses):
+		return info["validated_at"]
+	if not force and not hasattr(ses, "refresh"):
+		return None
+	with session_lock(path):
+		info = read_session_file(path)
+		if not force and session_is_fresh(info, ses):
+			return info["validated_at"]
+		refresh_session(ses)
+		validated_at = time.time()
+		info = {**session_info(ses), "validated_at": validated_at, "expires_at": validated_at + SESSION_TTL}
+		_write_session_file(path, info)
+	return validated_at
+
+
+def is_auth_failure(e) -> bool:
+	"""True for scratchattach auth errors and HTTP 401/403 responses."""
+	exceptions = optional_import("scratchattach.utils.exceptions")
+	if exceptions is not None and isinstance(e, (exceptions.Unauthenticated, exceptions.Unauthorized)):
+		return True
+	return getattr(getattr(e, "response", None), "status_code", None) in (401, 403)
+
+
+class LocalBackend:
+	"""Answers fetch/projects/messages queries through scratchattach, with optional caching.
+
+	``DaemonClient`` exposes the same methods, so command code does not care
+	whether results come from this process or from a running ``serve`` daemon.
+	"""
+
+	def __init__(self, session=None, cache=None, session_file=None):
+		self.session = session
+		self.cache = cache
+		# When set, a session re-validated after an auth failure is saved back here
+		self.session_file = session_file
+
+	def authed(self, call):
+		"""Run ``call()``; on an auth failure re-validate the session once and retry."""
+		try:
+			return call()
+		except Exception as e:
+			if self.session is None or not is_auth_failure(e):
+				raise
+			refresh_session(self.session)
+			if self.session_file:
+				save_session_info(self.session, validated_at=time.time(), path=self.session_file)
+			return call()
+
+	def cached(self, kind, key, fetch):
+		if self.cache is None:
+			return fetch()
+		return self.cache.get_or_fetch(kind, str(key).lower(), fetch)
+
+	def user(self, username, with_messages=False) -> dict:
+		"""Public profile dict; with a session and ``with_messages`` also the message count."""
+		session = self.session
+		data = self.cached("user", username, lambda: fetch_user_data(username, session=session))
+		if session is None or not with_messages:
+			return data
+		# One profile request (or a cache hit) builds the dict; the message count
+		# only needs a session-linked User, not a second profile update
+		data = {**data, "authenticated_view": True, "message_count": None}
+		try:
+			data["message_count"] = self.authed(scratchattach.User(username=username, _session=session).message_count)
+		except Exception:
+			data["message_count"] = None
+		return data
+
+	def projects(self, username, limit=20, offset=0):
+		"""Lazily yield project dicts (see ``iter_user_projects``), one cached page at a time."""
+		# Confirms the user exists (usually a cache hit) before paging through projects
+		self.user(username)
+		user = scratchattach.User(username=username, _session=self.session)
+
+		def fetch_page(offset):
+			return self.cached(
+				"projects", f"{username}:{offset}",
+				lambda: [project_to_dict(p) for p in user.projects(limit=PROJECTS_PAGE_SIZE, offset=offset)],
+			)
+
+		return iter_user_projects(username, limit=limit, fetch_page=fetch_page, offset=offset)
+
+	def project_detail(self, project_id) -> dict:
+		"""Full record for one project; a still-fresh cached detail is reused without a request."""
+		session = self.session
+		return self.cached("project", project_id, lambda: fetch_project_detail(project_id, session=session))
+
+	def messages(self, username, since=None, limit=None):
+		"""Lazily yield the account's messages newest first (see ``iter_messages``); requires a session.
+
+		Pages are not cached: with a ``since`` cursor a stale page would hide new messages.
+		"""
+		session = self.session
+		if session is None:
+			raise RuntimeError("Messages require an authenticated session")
+		account = getattr(session, "username", None)
+		if account and username and account.lower() != username.lower():
+			raise RuntimeError(f"Messages are only available for the logged-in account ({account})")
+
+		def fetch_page(offset):
+			return [message_to_dict(m) for m in self.authed(lambda: session.messages(limit=MESSAGES_PAGE_SIZE, offset=offset))]
+
+		return iter_messages(fetch_page, since=since, limit=limit)
+
+
+# Connection details of a running `serve` daemon (host, port, pid, access token)
+DAEMON_FILE = "~/.scratchattach/daemon.json"
+
+
+class DaemonClient:
+	"""Thin client for a running ``serve`` daemon; mirrors the LocalBackend query methods."""
+
+	def __init__(self, url, token, timeout=120):
+		self.url = url.rstrip("/")
+		self.token = token
+		self.timeout = timeout
+
+	@classmethod
+	def discover(cls, path=DAEMON_FILE):
+		"""Return a client for the daemon described in ``path`` if it answers, else None."""
+		path = os.path.expanduser(path)
+		try:
+			with open(path, "r", encoding="utf-8") as f:
+				info = json.load(f)
+			# Signal 0 only probes the pid on POSIX (on Windows os.kill would terminate it)
+			if os.name == "posix" and info.get("pid"):
+				os.kill(int(info["pid"]), 0)
+			client = cls(f"http://{info['host']}:{info['port']}", info.get("token", ""))
+			client.timeout = 2
+			client.health()
+			client.timeout = 120
+			return client
+		except Exception:
+			return None
+
+	def _open(self, endpoint, **params):
+		from urllib.error import HTTPError
+		from urllib.parse import urlencode
+		from urllib.request import Request, urlopen
+		query = urlencode({k: v for k, v in params.items() if v is not None})
+		req = Request(f"{self.url}/{endpoint}?{query}", headers={"X-Daemon-Token": self.token})
+		try:
+			return urlopen(req, timeout=self.timeout)
+		except HTTPError as e:
+			try:
+				message = json.loads(e.read().decode("utf-8")).get("error")
+			except Exception:
+				message = None
+			raise RuntimeError(message or f"daemon returned HTTP {e.code}")
+
+	def _get(self, endpoint, **params):
+		with self._open(endpoint, **params) as resp:
+			return json.loads(resp.read().decode("utf-8"))
+
+	def health(self) -> dict:
+		return self._get("health")
+
+	def user(self, username, with_messages=False) -> dict:
+		return self._get("fetch", username=username, with_messages=int(bool(with_messages)))
+
+	def project_detail(self, project_id) -> dict:
+		return self._get("project", id=project_id)
+
+	def projects(self, username, limit=20, offset=0):
+		return self._stream("projects", username=username, limit=limit, offset=offset)
+
+	def _stream(self, endpoint, **params):
+		resp = self._open(endpoint, **params)
+		with resp:
+			for line in resp:
+				record = json.loads(line)
+				if "__error__" in record:
+					raise RuntimeError(record["__error__"])
+				yield record
+
+	def messages(self, username, since=None, limit=None):
+		params = {"username": username}
+		if since is not None:
+			params["since"] = since
+		if limit:
+			params["limit"] = limit
+		return self._stream("messages", **params)
+
+
+def _make_daemon_handler():
+	from http.server import BaseHTTPRequestHandler
+
+	class DaemonHandler(BaseHTTPRequestHandler):
+		"""Routes GET /health, /fetch, /project, /projects and /messages to the server's backend (the last two stream NDJSON)."""
+
+		def log_message(self, format, *args):
+			if getattr(self.server, "verbose", False):
+				super().log_message(format, *args)
+
+		def _send_json(self, status, obj):
+			body = json.dumps(obj, default=str).encode("utf-8")
+			self.send_response(status)
+			self.send_header("Content-Type", "application/json")
+			self.send_header("Content-Length", str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def do_GET(self):
+			import hmac
+			from urllib.parse import urlsplit, parse_qs
+			if not hmac.compare_digest(self.headers.get("X-Daemon-Token", ""), self.server.token):
+				return self._send_json(403, {"error": "invalid daemon token"})
+			parts = urlsplit(self.path)
+			params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+			endpoint = parts.path.strip("/")
+			backend = self.server.backend
+			username = params.get("username")
+			try:
+				if endpoint == "health":
+					return self._send_json(200, {
+						"pid": os.getpid(),
+						"session_user": getattr(backend.session, "username", None),
+						"connections": connection_stats(),
+					})
+				if endpoint == "project":
+					if not params.get("id"):
+						return self._send_json(400, {"error": "missing 'id'"})
+					return self._send_json(200, backend.project_detail(params["id"]))
+				if endpoint not in ("fetch", "projects", "messages"):
+					return self._send_json(404, {"error": f"unknown endpoint '{endpoint}'"})
+				if not username:
+					return self._send_json(400, {"error": "missing 'username'"})
+				if endpoint == "fetch":
+					return self._send_json(200, backend.user(username, with_messages=params.get("with_messages") == "1"))
+				# projects/messages: stream NDJSON; the first page is fetched before the status line is sent
+				if endpoint == "messages":
+					since = params.get("since")
+					records = backend.messages(username, since=int(since) if since else None, limit=int(params.get("limit", 0)))
+				else:
+					records = backend.projects(username, limit=int(params.get("limit", 20)), offset=int(params.get("offset", 0)))
+				first = next(records, None)
+			except Exception as e:
+				return self._send_json(500, {"error": describe_error(e)})
+			self.send_response(200)
+			self.send_header("Content-Type", "application/x-ndjson")
+			self.end_headers()
+			try:
+				if first is not None:
+					self.wfile.write((json.dumps(first, default=str) + "\n").encode("utf-8"))
+					for record in records:
+						self.wfile.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+			except Exception as e:
+				self.wfile.write((json.dumps({"__error__": describe_error(e)}) + "\n").encode("utf-8"))
+
+	return DaemonHandler
+
+
+def serve(backend, host="127.0.0.1", port=8765, daemon_file=DAEMON_FILE, verbose=False):
+	"""Answer fetch/projects/messages queries over local HTTP until interrupted.
+
+	The authenticated session and caches in ``backend`` live for the whole
+	process; connection details and a random access token are written to
+	``daemon_file`` (mode 0600) so CLI invocations can find the daemon.
+	"""
+	import secrets
+	from http.server import ThreadingHTTPServer
+	server = ThreadingHTTPServer((host, port), _make_daemon_handler())
+	server.daemon_threads = True
+	server.backend = backend
+	server.token = secrets.token_hex(16)
+	server.verbose = verbose
+	path = os.path.expanduser(daemon_file)
+	os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+	info = {"host": host, "port": server.server_address[1], "pid": os.getpid(), "token": server.token}
+	fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(fd, "w", encoding="utf-8") as f:
+		json.dump(info, f)
+	print(f"Serving on http://{host}:{info['port']} (pid {info['pid']}); Ctrl-C to stop", file=sys.stderr)
+	if threading.current_thread() is threading.main_thread():
+		import signal
+		# Treat SIGTERM like Ctrl-C so the daemon file is always cleaned up
+		signal.signal(signal.SIGTERM, signal.default_int_handler)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		try:
+			with open(path, "r", encoding="utf-8") as f:
+				if json.load(f).get("pid") == os.getpid():
+					os.remove(path)
+		except Exception:
+			pass
+
+
+class Checkpoint:
+	"""Append-only progress log that makes batch exports resumable (``--resume``).
+
+	Each line is ``key<TAB>cursor<TAB>export size``, written only after the
+	records for ``key`` were flushed to the export. Resuming truncates the
+	export back to the last logged size, so a record written just before a
+	crash is rewritten once rather than duplicated, and continues from the
+	logged keys/cursors. A torn last line (crash mid-write) is ignored. The log
+	is deleted once the job completes, so it only exists for unfinished runs.
+	"""
+
+	def __init__(self, path, export_path, resume=False):
+		self.path = path
+		self.export_path = export_path
+		self.done = {}
+		size = 0
+		if resume:
+			if not os.path.exists(path):
+				raise RuntimeError(f"No checkpoint at {path}; nothing to resume")
+			with open(path, "r", encoding="utf-8") as f:
+				for line in f:
+					parts = line.rstrip("\n").split("\t")
+					if len(parts) != 3 or not parts[2].isdigit():
+						continue
+					self.done[parts[0]] = parts[1]
+					size = int(parts[2])
+			if os.path.exists(export_path) and os.path.getsize(export_path) > size:
+				with open(export_path, "r+b") as f:
+					f.truncate(size)
+		self._log = open(path, "a" if resume else "w", encoding="utf-8")
+
+	def cursor(self, key, default=None):
+		return self.done.get(key.lower(), default)
+
+	def commit(self, key, writer, cursor=""):
+		"""Record ``key`` (with ``cursor``) as complete once ``writer``'s output is flushed."""
+		writer.flush()
+		key = key.lower()
+		self.done[key] = str(cursor)
+		self._log.write(f"{key}\t{cursor}\t{os.path.getsize(self.export_path)}\n")
+		self._log.flush()
+
+	def close(self, complete=False):
+		"""Close the log; ``complete=True`` means the job finished and the log is removed."""
+		self._log.close()
+		if complete and os.path.exists(self.path):
+			os.remove(self.path)
+
+
+def read_usernames(names=None, file_path=None):
+	"""Yield usernames from CLI args and/or a file ('-' reads stdin), skipping blanks, comments and repeats."""
+	seen = set()
+
+	def _clean(lines):
+		for line in lines:
+			name = line.strip()
+			if not name or name.startswith("#") or name in seen:
+				continue
+			seen.add(name)
+			yield name
+
+	for name in _clean(names or []):
+		yield name
+	if file_path == "-":
+		for name in _clean(sys.stdin):
+			yield name
+	elif file_path:
+		with open(file_path, "r", encoding="utf-8") as f:
+			for name in _clean(f):
+				yield name
+
+
+def bounded_map(fn, items, workers=8, ordered=False):
+	"""Run ``fn`` over ``items`` on a bounded thread pool.
+
+	Yields ``(item, result, error)`` tuples as each call finishes (or in input
+	order when ``ordered`` is set). A failed call yields its exception instead
+	of aborting the batch. At most ``workers * 2`` calls are queued at once so
+	very large (or streamed) inputs are never fully materialized.
+	"""
+	workers = max(1, int(workers or 1))
+	max_pending = workers * 2
+	source = iter(items)
+	pending = deque()
+	end = object()
+
+	def _result(item, fut):
+		try:
+			return item, fut.result(), None
+		except Exception as e:
+			return item, None, e
+
+	from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+	with ThreadPoolExecutor(max_workers=workers) as pool:
+		try:
+			exhausted = False
+			while True:
+				while not exhausted and len(pending) < max_pending:
+					item = next(source, end)
+					if item is end:
+						exhausted = True
+						break
+					pending.append((item, pool.submit(fn, item)))
+				if not pending:
+					break
+				if ordered:
+					item, fut = pending.popleft()
+					yield _result(item, fut)
+					continue
+				done, _ = wait([fut for _, fut in pending], return_when=FIRST_COMPLETED)
+				for entry in [entry for entry in pending if entry[1] in done]:
+					pending.remove(entry)
+					yield _result(*entry)
+		finally:
+			# Consumer stopped early (or Ctrl-C): drop calls that have not started yet
+			for _, fut in pending:
+				fut.cancel()
+
+
+def fetch_users_bulk(usernames, workers=8, ordered=False, fetch=fetch_user_data):
+	"""Fetch many users through ``bounded_map``; yields ``(username, data, error)`` tuples."""
+	return bounded_map(fetch, usernames, workers=workers, ordered=ordered)
+
+
+class AsyncFetcher:
+	"""asyncio front-end for the blocking scratchattach helpers.
+
+	Each call runs on a private executor, and one semaphore caps the number of
+	upstream calls in flight across every helper. ``fetch`` replaces the user
+	lookup (e.g. with a cached one) the same way as in ``fetch_users_bulk``;
+	projects and messages go through ``backend`` (a LocalBackend by default),
+	so they share its cache and paging.
+	"""
+
+	def __init__(self, concurrency=64, session=None, fetch=fetch_user_data, backend=None):
+		self.concurrency = max(1, int(concurrency or 1))
+		self.session = session
+		self.backend = backend or LocalBackend(session)
+		self._fetch = fetch
+		from concurrent.futures import ThreadPoolExecutor
+		self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="async-fetch")
+		self._semaphore = None
+
+	async def _call(self, fn, *args):
+		import asyncio
+		# Created lazily so the semaphore belongs to the running loop
+		if self._semaphore is None:
+			self._semaphore = asyncio.Semaphore(self.concurrency)
+		async with self._semaphore:
+			loop = asyncio.get_running_loop()
+			return await loop.run_in_executor(self._executor, fn, *args)
+
+	async def user(self, username: str) -> dict:
+		return await self._call(self._fetch, username)
+
+	async def projects(self, username: str, limit=40) -> list:
+		return await self._call(lambda: list(self.backend.projects(username, limit=limit)))
+
+	async def messages(self, username: str, since=None, limit=None) -> list:
+		"""Message dicts for ``username``, newest first (see LocalBackend.messages)."""
+		return await self._call(lambda: list(self.backend.messages(username, since=since, limit=limit)))
+
+	async def users(self, usernames, ordered=False):
+		"""Async counterpart of ``fetch_users_bulk``: yields ``(username, data, error)``.
+
+		Only ``concurrency * 2`` lookups are scheduled at a time. Closing the
+		generator (or cancelling the task consuming it) cancels every pending lookup.
+		"""
+		import asyncio
+		names = iter(usernames)
+		pending = deque()
+		max_pending = self.concurrency * 2
+
+		async def _one(name):
+			try:
+				return name, await self.user(name), None
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				return name, None, e
+
+		try:
+			exhausted = False
+			while True:
+				while not exhausted and len(pending) < max_pending:
+					name = next(names, None)
+					if name is None:
+						exhausted = True
+						break
+					pending.append(asyncio.ensure_future(_one(name)))
+				if not pending:
+					break
+				if ordered:
+					yield await pending.popleft()
+					continue
+				done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+				for task in [t for t in pending if t in done]:
+					pending.remove(task)
+					yield task.result()
+		finally:
+			for task in pending:
+				task.cancel()
+
+	def close(self):
+		self._executor.shutdown(wait=False)
+
+
+CRAWL_RELATIONS = ("followers", "following")
+
+
+class CrawlState:
+	"""On-disk BFS state for ``crawl``: the visited set and the frontier of page cursors.
+
+	``nodes`` is the visited set (its primary-key index makes membership checks
+	cheap at millions of users without holding them in memory). ``tasks`` holds
+	one pending cursor per (username, relation) still being paged through.
+	Every processed page is committed, so an interrupted crawl resumes where it stopped.
+	"""
+
+	def __init__(self, path, reset=False):
+		import sqlite3
+		self.path = path
+		self._db = sqlite3.connect(path, isolation_level=None)
+		self._db.execute("PRAGMA journal_mode=WAL")
+		if reset:
+			self._db.executescript("DROP TABLE IF EXISTS nodes; DROP TABLE IF EXISTS tasks; DROP TABLE IF EXISTS meta;")
+		self._db.executescript(
+			"CREATE TABLE IF NOT EXISTS nodes (username TEXT PRIMARY KEY, depth INTEGER NOT NULL) WITHOUT ROWID;"
+			"CREATE TABLE IF NOT EXISTS tasks (username TEXT NOT NULL, relation TEXT NOT NULL, "
+			"next_offset INTEGER NOT NULL, depth INTEGER NOT NULL, PRIMARY KEY (username, relation));"
+			"CREATE INDEX IF NOT EXISTS tasks_depth ON tasks (depth);"
+			"CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+		)
+
+	def get_meta(self, key, default=None):
+		row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+		return json.loads(row[0]) if row else default
+
+	def set_meta(self, key, value):
+		self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+	def add_nodes(self, usernames, depth, max_depth, relations):
+		"""Mark unseen ``usernames`` visited; those above ``max_depth`` also get page cursors. Returns the new names."""
+		new = []
+		for name in usernames:
+			key = name.lower()
+			if self._db.execute("INSERT OR IGNORE INTO nodes (username, depth) VALUES (?, ?)", (key, depth)).rowcount:
+				new.append(name)
+				if depth < max_depth:
+					self._db.executemany(
+						"INSERT OR IGNORE INTO tasks (username, relation, next_offset, depth) VALUES (?, ?, 0, ?)",
+						[(name, relation, depth) for relation in relations],
+					)
+		return new
+
+	def next_tasks(self, n, skip=()):
+		"""Up to ``n`` pending (username, relation, offset, depth) cursors, shallowest first."""
+		rows = self._db.execute(
+			"SELECT username, relation, next_offset, depth FROM tasks ORDER BY depth LIMIT ?", (n + len(skip),)
+		).fetchall()
+		return [r for r in rows if (r[0], r[1]) not in skip][:n]
+
+	def advance(self, username, relation, next_offset):
+		"""Move a cursor to ``next_offset``, or drop it when ``next_offset`` is None (relation exhausted)."""
+		if next_offset is None:
+			self._db.execute("DELETE FROM tasks WHERE username = ? AND relation = ?", (username, relation))
+		else:
+			self._db.execute(
+				"UPDATE tasks SET next_offset = ? WHERE username = ? AND relation = ?", (next_offset, username, relation)
+			)
+
+	def transaction(self):
+		return _SqliteTransaction(self._db)
+
+	def counts(self) -> dict:
+		return {
+			"visited": self._db.execute("SELECT COUNT(*) FROM nodes").fetchone()[0],
+			"pending": self._db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0],
+		}
+
+	def close(self):
+		self._db.close()
+
+
+class _SqliteTransaction:
+	"""``with`` block that wraps statements in BEGIN/COMMIT (ROLLBACK on error)."""
+
+	def __init__(self, db):
+		self._db = db
+
+	def __enter__(self):
+		self._db.execute("BEGIN")
+		return self._db
+
+	def __exit__(self, exc_type, *exc):
+		self._db.execute("ROLLBACK" if exc_type else "COMMIT")
+		return False
+
+
+def fetch_relation_page(username, relation, offset, session=None):
+	"""One API page (up to 40) of the usernames in ``username``'s followers or following."""
+	user = scratchattach.User(username=username, _session=session)
+	page = getattr(user, relation)(limit=PROJECTS_PAGE_SIZE, offset=offset)
+	return [getattr(u, "username", None) or str(u) for u in page]
+
+
+def crawl_graph(seeds, state, emit, depth=1, relations=CRAWL_RELATIONS, workers=8, fetch_page=fetch_relation_page, flush=None):
+	"""Breadth-first walk of follower/following edges from ``seeds``.
+
+	Each unit of work is one API page, so memory is bounded by ``workers`` pages
+	in flight, whatever the size of the graph. ``emit(edge)`` receives
+	``{"source", "target", "depth"}`` dicts ("source follows target") before the
+	page is committed to ``state`` (``flush()``, if given, runs in between); after
+	a crash the last uncommitted pages are fetched (and emitted) again.
+	Returns ``{"pages", "edges", "failed"}``.
+	"""
+	from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+	workers = max(1, int(workers or 1))
+	with state.transaction():
+		state.add_nodes(seeds, 0, depth, relations)
+	stats = {"pages": 0, "edges": 0, "failed": 0}
+	inflight = {}
+	executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl")
+	try:
+		while True:
+			running = {(task[0], task[1]) for task in inflight.values()}
+			for task in state.next_tasks(workers * 2 - len(inflight), skip=running):
+				inflight[executor.submit(fetch_page, *task[:3])] = task
+			if not inflight:
+				break
+			done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+			for future in done:
+				username, relation, offset, d = inflight.pop(future)
+				try:
+					names = future.result()
+				except Exception as e:
+					# Retries already happened in the HTTP hooks; give up on this relation
+					stats["failed"] += 1
+					print(f"crawl: {relation} of {username} failed: {describe_error(e)}", file=sys.stderr)
+					names, next_offset = [], None
+				else:
+					next_offset = offset + len(names) if len(names) >= PROJECTS_PAGE_SIZE else None
+				for name in names:
+					source, target = (name, username) if relation == "followers" else (username, name)
+					emit({"source": source, "target": target, "depth": d + 1})
+				stats["edges"] += len(names)
+				stats["pages"] += 1
+				if flush is not None:
+					flush()
+				with state.transaction():
+					state.add_nodes(names, d + 1, depth, relations)
+					state.advance(username, relation, next_offset)
+	finally:
+		for future in inflight:
+			future.cancel()
+		executor.shutdown(wait=True)
+	return stats
+
+
+def upstream_get(url, **kwargs):
+	"""GET ``url`` through scratchattach's shared HTTP session (rate limited, retried and counted).
+
+	Calls ``request`` directly: the session's ``get()`` parses every body as JSON
+	to check for API errors, which fails for images and other binary content.
+	"""
+	scratchattach._load()  # installs the HTTP hooks on first use
+	from scratchattach.utils.requests import requests as sa_requests
+	return sa_requests.request("GET", url, **kwargs)
+
+
+class ImageStore:
+	"""Content-addressed image store for ``--images``.
+
+	Files live at ``<root>/<sha256[:2]>/<sha256><ext>``, so identical images
+	are stored once. ``index.sqlite`` maps each URL to its file and the ETag /
+	Last-Modified validators, so repeat downloads are conditional requests
+	answered with 304 when nothing changed.
+	"""
+
+	CHUNK = 64 * 1024
+
+	def __init__(self, root, get=upstream_get):
+		import sqlite3
+		self.root = os.path.expanduser(root)
+		os.makedirs(self.root, exist_ok=True)
+		self.get = get
+		self._db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), isolation_level=None, check_same_thread=False)
+		self._db.execute(
+			"CREATE TABLE IF NOT EXISTS images (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, ext TEXT, "
+			"etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)"
+		)
+		self._lock = threading.Lock()
+
+	def path_for(self, sha256, ext=""):
+		return os.path.join(self.root, sha256[:2], sha256 + (ext or ""))
+
+	def lookup(self, url):
+		"""``(path, etag, last_modified)`` for a stored URL, or None."""
+		with self._lock:
+			row = self._db.execute("SELECT sha256, ext, etag, last_modified FROM images WHERE url = ?", (url,)).fetchone()
+		if row is None or not os.path.exists(self.path_for(row[0], row[1])):
+			return None
+		return self.path_for(row[0], row[1]), row[2], row[3]
+
+	def fetch(self, url) -> dict:
+		"""Download ``url`` unless the stored copy is still current; returns ``{"url", "path", "status"}``.
+
+		``status`` is "downloaded", "deduplicated" (new URL, bytes already stored)
+		or "not-modified". The body is streamed to disk while it is hashed.
+		"""
+		import hashlib
+		from urllib.parse import urlsplit
+		known = self.lookup(url)
+		headers = {}
+		if known is not None:
+			if known[1]:
+				headers["If-None-Match"] = known[1]
+			if known[2]:
+				headers["If-Modified-Since"] = known[2]
+		resp = self.get(url, headers=headers, stream=True, timeout=30)
+		try:
+			if resp.status_code == 304 and known is not None:
+				return {"url": url, "path": known[0], "status": "not-modified"}
+			if resp.status_code != 200:
+				raise RuntimeError(f"HTTP {resp.status_code} for {url}")
+			ext = os.path.splitext(urlsplit(url).path)[1].lower()[:8]
+			digest = hashlib.sha256()
+			tmp = os.path.join(self.root, f".download-{threading.get_ident()}-{os.getpid()}")
+			try:
+				with open(tmp, "wb") as f:
+					for chunk in resp.iter_content(self.CHUNK):
+						digest.update(chunk)
+						f.write(chunk)
+				sha = digest.hexdigest()
+				path = self.path_for(sha, ext)
+				if os.path.exists(path):
+					status = "deduplicated"
+				else:
+					os.makedirs(os.path.dirname(path), exist_ok=True)
+					os.replace(tmp, path)
+					status = "downloaded"
+			finally:
+				# Leftover after a failed download or a duplicate; gone once renamed into place
+				if os.path.exists(tmp):
+					os.remove(tmp)
+		finally:
+			resp.close()
+		with self._lock:
+			self._db.execute(
+				"INSERT OR REPLACE INTO images (url, sha256, ext, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+				(url, sha, ext, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), time.time()),
+			)
+		return {"url": url, "path": path, "status": status}
+
+	def close(self):
+		self._db.close()
+
+
+class ImageDownloader:
+	"""Background pool feeding URLs into an ImageStore while records stream out.
+
+	Each URL is fetched at most once per run, and ``submit`` blocks once
+	``workers * 4`` downloads are pending, so memory stays bounded.
+	"""
+
+	def __init__(self, store, workers=8):
+		from concurrent.futures import ThreadPoolExecutor
+		self.store = store
+		self.stats = {"downloaded": 0, "deduplicated": 0, "not-modified": 0, "failed": 0}
+		self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="images")
+		self._slots = threading.BoundedSemaphore(max(1, workers) * 4)
+		self._seen = set()
+		self._lock = threading.Lock()
+
+	def submit(self, url):
+		if not url or url in self._seen:
+			return
+		self._seen.add(url)
+		self._slots.acquire()
+		self._executor.submit(self._run, url)
+
+	def tee(self, records, field):
+		"""Yield ``records`` unchanged, submitting each record's ``field`` URL on the way through."""
+		for r in records:
+			self.submit(r.get(field))
+			yield r
+
+	def _run(self, url):
+		try:
+			status = self.store.fetch(url)["status"]
+		except Exception as e:
+			status = "failed"
+			print(f"image {url}: {describe_error(e)}", file=sys.stderr)
+		finally:
+			self._slots.release()
+		with self._lock:
+			self.stats[status] += 1
+
+	def close(self) -> dict:
+		self._executor.shutdown(wait=True)
+		self.store.close()
+		return self.stats
+
+
+# Default database for --store and `query`
+STORE_FILE = "~/.scratchattach/store.sqlite"
+
+
+class SnapshotStore:
+	"""Local SQLite database of fetched users, projects and messages (``--store``).
+
+	Records are upserted in batches of ``batch_size`` per transaction, so storing
+	a large bulk run costs a handful of commits. Frequently filtered columns are
+	kept as indexed columns; the full record is stored as JSON in ``data``.
+	"""
+
+	SCHEMA = (
+		"CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY COLLATE NOCASE, id INTEGER, "
+		"country TEXT COLLATE NOCASE, join_date TEXT, data TEXT NOT NULL, fetched_at REAL NOT NULL);"
+		"CREATE INDEX IF NOT EXISTS users_country ON users (country);"
+		"CREATE INDEX IF NOT EXISTS users_join_date ON users (join_date);"
+		"CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, username TEXT COLLATE NOCASE, title TEXT, "
+		"views INTEGER, loves INTEGER, data TEXT NOT NULL, fetched_at REAL NOT NULL);"
+		"CREATE INDEX IF NOT EXISTS projects_username ON projects (username);"
+		"CREATE TABLE IF NOT EXISTS messages (account TEXT COLLATE NOCASE, id INTEGER, type TEXT, "
+		"created TEXT, data TEXT NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (account, id));"
+	)
+	UPSERTS = {
+		"users": "INSERT OR REPLACE INTO users (username, id, country, join_date, data, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+		"projects": "INSERT OR REPLACE INTO projects (id, username, title, views, loves, data, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+		"messages": "INSERT OR REPLACE INTO messages (account, id, type, created, data, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+	}
+
+	def __init__(self, path, batch_size=500):
+		import sqlite3
+		path = os.path.expanduser(path)
+		if os.path.dirname(path):
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+		self.path = path
+		self.batch_size = batch_size
+		self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+		self._db.execute("PRAGMA journal_mode=WAL")
+		self._db.executescript(self.SCHEMA)
+		self._pending = {table: [] for table in self.UPSERTS}
+		self._lock = threading.Lock()
+
+	def _add(self, table, row):
+		with self._lock:
+			self._pending[table].append(row)
+			if len(self._pending[table]) >= self.batch_size:
+				self._flush()
+
+	def add_user(self, data):
+		if not data or not data.get("username"):
+			return
+		self._add("users", (data["username"], data.get("id"), data.get("country"), _iso(data.get("join_date")),
+			json.dumps(data, default=str), time.time()))
 
-# Try to load environment variables from a .env file if python-dotenv is available
-try:
-	from dotenv import load_dotenv
-	_dotenv_loaded = load_dotenv(os.path.join(os.getcwd(), '.env'))
-except Exception:
-	_dotenv_loaded = False
+	def add_project(self, username, data):
+		if data.get("id") is None:
+			return
+		self._add("projects", (data["id"], username, data.get("title"), data.get("views"), data.get("loves"),
+			json.dumps(data, default=str), time.time()))
 
-# Ensure packages installed into the workspace-local `.local-packages` are importable
-local_packages = os.path.join(os.getcwd(), '.local-packages')
-if local_packages not in sys.path:
-	sys.path.insert(0, local_packages)
+	def add_message(self, account, data):
+		self._add("messages", (account, data.get("id"), data.get("type"), _iso(data.get("datetime_created")),
+			json.dumps(data, default=str), time.time()))
 
-import scratchattach
-import textwrap
-import warnings
-try:
-	import keyring
-	HAVE_KEYRING = True
-except Exception:
-	HAVE_KEYRING = False
-try:
-	from rich.console import Console
-	from rich.markdown import Markdown
-	from rich.panel import Panel
-	HAVE_RICH = True
-	_console = Console()
-except Exception:
-	HAVE_RICH = False
-	_console = None
-
-
-def fetch_user_data(username: str) -> dict:
-	"""Fetch basic public data for a Scratch username using scratchattach."""
-	user = scratchattach.get_user(username)
-	ok = user.update()
-	if not ok:
-		raise RuntimeError(f"Failed to fetch data for user '{username}': {ok}")
+	def tee_projects(self, username, projects):
+		"""Pass streamed project dicts through unchanged, storing each one."""
+		for p in projects:
+			self.add_project(username, p)
+			yield p
+
+	def _flush(self):
+		# Callers hold the lock
+		if not any(self._pending.values()):
+			return
+		self._db.execute("BEGIN")
+		try:
+			for table, rows in self._pending.items():
+				if rows:
+					self._db.executemany(self.UPSERTS[table], rows)
+			self._db.execute("COMMIT")
+		except Exception:
+			self._db.execute("ROLLBACK")
+			raise
+		finally:
+			self._pending = {table: [] for table in self.UPSERTS}
+
+	def flush(self):
+		with self._lock:
+			self._flush()
 
+	def query(self, table, where=(), params=(), order_by=None, limit=None):
+		"""Yield stored records (the JSON ``data``) from ``table`` matching all ``where`` clauses."""
+		sql = f"SELECT data FROM {table}"
+		if where:
+			sql += " WHERE " + " AND ".join(where)
+		if order_by:
+			sql += f" ORDER BY {order_by}"
+		if limit:
+			sql += f" LIMIT {int(limit)}"
+		self.flush()
+		for (data,) in self._db.execute(sql, tuple(params)):
+			yield json.loads(data)
+
+	def close(self):
+		self.flush()
+		self._db.close()
+
+
+def _iso(value):
+	"""Dates as sortable ISO strings (datetimes from scratchattach, or strings as given)."""
+	if value is None:
+		return None
+	return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def build_store_query(args):
+	"""Translate ``query`` subcommand filters into ``SnapshotStore.query`` arguments."""
+	where, params = [], []
+	if args.table == "users":
+		if args.country:
+			where.append("country = ?")
+			params.append(args.country)
+		if args.joined_after:
+			where.append("join_date > ?")
+			params.append(args.joined_after)
+		if args.joined_before:
+			where.append("join_date < ?")
+			params.append(args.joined_before)
+		if args.username:
+			where.append("username LIKE ?")
+			params.append(args.username)
+		order_by = "join_date"
+	elif args.table == "projects":
+		if args.username:
+			where.append("username = ?")
+			params.append(args.username)
+		if args.min_views is not None:
+			where.append("views >= ?")
+			params.append(args.min_views)
+		order_by = "views DESC"
+	else:
+		if args.username:
+			where.append("account = ?")
+			params.append(args.username)
+		order_by = "created DESC"
+	return {"where": where, "params": params, "order_by": order_by, "limit": args.limit}
+
+
+def diff_fields(old, new) -> dict:
+	"""``{field: {"old": ..., "new": ...}}`` for every field whose value changed."""
 	return {
-		"id": getattr(user, "id", None),
-		"username": getattr(user, "username", None),
-		"about_me": getattr(user, "about_me", None),
-		"wiwo": getattr(user, "wiwo", None),
-		"country": getattr(user, "country", None),
-		"icon_url": getattr(user, "icon_url", None),
-		"join_date": getattr(user, "join_date", None),
-		"scratchteam": getattr(user, "scratchteam", None),
+		k: {"old": old.get(k), "new": new.get(k)}
+		for k in dict.fromkeys(list(old) + list(new))
+		if old.get(k) != new.get(k)
 	}
 
 
-def main():
+def user_poller(username, fetch=fetch_user_data):
+	"""Watch entity for a profile: reports changed fields after the first (baseline) poll."""
+	def poll(previous):
+		data = fetch(username)
+		if previous is None:
+			return data, []
+		changes = diff_fields(previous, data)
+		return data, ([{"entity": "user", "username": username, "changes": changes}] if changes else [])
+	return poll
+
+
+def messages_poller(session, keep=500):
+	"""Watch entity for the session's inbox: reports messages not seen in earlier polls.
+
+	Only the first page is requested, and the snapshot is just the most recent
+	``keep`` message ids.
+	"""
+	def poll(previous):
+		msgs = [message_to_dict(m) for m in session.messages(limit=PROJECTS_PAGE_SIZE)]
+		ids = [m.get("id") for m in msgs]
+		if previous is None:
+			return ids[:keep], []
+		seen = set(previous)
+		username = getattr(session, "username", None)
+		# The API lists newest first; report in arrival order
+		events = [{"entity": "message", "username": username, "message": m} for m in reversed(msgs) if m.get("id") not in seen]
+		current = set(ids)
+		return (ids + [i for i in previous if i not in current])[:keep], events
+	return poll
+
+
+class Watcher:
+	"""Polls entities on their own schedule and emits only what changed.
+
+	Each entity starts at ``interval`` seconds; every poll without a change
+	doubles its interval up to ``max_interval``, and a change resets it, so
+	upstream traffic follows the change rate rather than the number of
+	entities. Due polls come off a heap, so scheduling is O(log n) per poll.
+	"""
+
+	def __init__(self, emit, interval=60.0, max_interval=3600.0, clock=time.monotonic, sleep=time.sleep):
+		self.emit = emit
+		self.interval = max(0.0, float(interval))
+		self.max_interval = max(self.interval, float(max_interval))
+		self.clock = clock
+		self.sleep = sleep
+		self.snapshots = {}
+		self.intervals = {}
+		self.polls = 0
+		self._pollers = {}
+		self._heap = []
+		self._seq = 0
+
+	def add(self, key, poll):
+		"""Register ``poll(previous_snapshot) -> (snapshot, events)`` under ``key``; it runs immediately."""
+		self._pollers[key] = poll
+		self.intervals[key] = self.interval
+		self._schedule(key, self.clock())
+
+	def _schedule(self, key, due):
+		import heapq
+		self._seq += 1
+		heapq.heappush(self._heap, (due, self._seq, key))
+
+	def run(self, max_polls=None):
+		"""Poll until interrupted (or ``max_polls`` polls have run)."""
+		import heapq
+		while self._heap and (not max_polls or self.polls < max_polls):
+			due, _, key = heapq.heappop(self._heap)
+			delay = due - self.clock()
+			if delay > 0:
+				self.sleep(delay)
+			self.polls += 1
+			changed = False
+			try:
+				snapshot, events = self._pollers[key](self.snapshots.get(key))
+			except Exception as e:
+				print(f"watch: {key}: {describe_error(e)}", file=sys.stderr)
+			else:
+				self.snapshots[key] = snapshot
+				for event in events:
+					self.emit({"time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), **event})
+				changed = bool(events)
+			if changed:
+				self.intervals[key] = self.interval
+			else:
+				self.intervals[key] = min(self.max_interval, max(self.intervals[key] * 2, 1.0))
+			self._schedule(key, self.clock() + self.intervals[key])
+
+
+def profile_session(prof):
+	"""Log in with a config.toml profile's own credentials; None when it has none.
+
+	Profile sessions are not written to the shared session file, so parallel
+	profiles never overwrite each other's (or the default) saved session.
+	"""
+	if prof.get("session_string"):
+		return scratchattach.login_by_session_string(prof["session_string"])
+	if prof.get("login_username") and prof.get("login_password"):
+		return scratchattach.login(prof["login_username"], prof["login_password"])
+	return None
+
+
+# config.toml tables that configure the tool rather than naming a profile
+CONFIG_SECTIONS = ("cache",)
+
+
+def select_profiles(config, names) -> dict:
+	"""Profile tables for ``--profiles`` ("all" or comma-separated names); raises KeyError for unknown names."""
+	tables = {k: v for k, v in (config or {}).items() if isinstance(v, dict) and k not in CONFIG_SECTIONS}
+	if names.strip().lower() == "all":
+		return tables
+	selected = {}
+	for name in (n.strip() for n in names.split(",")):
+		if name:
+			if name not in tables:
+				raise KeyError(name)
+			selected[name] = tables[name]
+	return selected
+
+
+def run_profiles(profiles, command, emit, username=None, limit=20, cache=None, rate=10.0, burst=20, login=profile_session):
+	"""Run ``command`` (fetch/projects/messages) for every profile concurrently.
+
+	``profiles`` maps profile names to their config.toml tables. Each profile
+	gets its own session and its own token bucket (a ``rate``/``burst`` in the
+	profile overrides the defaults); every record passed to ``emit`` is tagged
+	with ``"profile"``, and a failing profile yields one ``"error"`` record
+	instead of stopping the others. Records are emitted from the calling
+	thread as they arrive. Returns the number of failed profiles.
+	"""
+	import queue
+	from concurrent.futures import ThreadPoolExecutor
+	results = queue.Queue(maxsize=256)
+	done = object()
+	# Set when the consumer stops early (emit raised, Ctrl-C) so workers stop
+	# waiting on a queue nobody drains and the pool can shut down
+	stop = threading.Event()
+
+	def put(record):
+		while not stop.is_set():
+			try:
+				results.put(record, timeout=0.1)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+	def job(name, prof):
+		bucket_rate = float(prof.get("rate", rate))
+		token = PROFILE_LIMITER.set(TokenBucket(bucket_rate, int(prof.get("burst", burst))) if bucket_rate > 0 else None)
+		try:
+			session = login(prof)
+			backend = LocalBackend(session, cache)
+			target = username or prof.get("username") or prof.get("login_username") or getattr(session, "username", None)
+			if not target:
+				raise RuntimeError("no username (set `username` in the profile or pass one)")
+			if command == "projects":
+				for p in backend.projects(target, limit=limit):
+					if not put({"profile": name, **p}):
+						return
+			elif command == "messages":
+				if session is None:
+					raise RuntimeError("messages require credentials in the profile")
+				for m in backend.messages(target, limit=limit):
+					if not put({"profile": name, "account": target, **m}):
+						return
+			else:
+				put({"profile": name, **backend.user(target, with_messages=session is not None)})
+		except Exception as e:
+			put({"profile": name, "error": describe_error(e)})
+		finally:
+			PROFILE_LIMITER.reset(token)
+			put(done)
+
+	failed = 0
+	with ThreadPoolExecutor(max_workers=max(1, len(profiles)), thread_name_prefix="profile") as pool:
+		for name, prof in profiles.items():
+			pool.submit(job, name, prof)
+		remaining = len(profiles)
+		try:
+			while remaining:
+				record = results.get()
+				if record is done:
+					remaining -= 1
+					continue
+				if "error" in record:
+					failed += 1
+				emit(record)
+		finally:
+			stop.set()
+	return failed
+
+
+# Columns of `analyze` output, one record per project
+ANALYSIS_FIELDS = [
+	"id", "title", "author", "format", "sprites", "blocks", "scripts", "unique_opcodes", "top_opcodes",
+	"costumes", "sounds", "unique_assets", "sound_seconds", "variables", "lists", "comments",
+	"extensions", "json_bytes", "error",
+]
+
+
+def download_project_json(project_id, dest_dir, session=None, get=upstream_get) -> str:
+	"""Stream a project's source (project.json, or a legacy .sb/.sb2 archive) into a temp file; returns its path."""
+	import tempfile
+	project = scratchattach.Project(id=int(project_id), _session=session)
+	project.update()
+	token = getattr(project, "project_token", None)
+	url = f"https://projects.scratch.mit.edu/{int(project_id)}" + (f"?token={token}" if token else "")
+	resp = get(url, stream=True, timeout=60)
+	try:
+		if resp.status_code != 200:
+			raise RuntimeError(f"HTTP {resp.status_code} for project {project_id} source")
+		fd, path = tempfile.mkstemp(prefix=f"project-{int(project_id)}-", dir=dest_dir)
+		with os.fdopen(fd, "wb") as f:
+			for chunk in resp.iter_content(64 * 1024):
+				f.write(chunk)
+	finally:
+		resp.close()
+	return path
+
+
+def _analyze_target(m, target, opcodes, assets):
+	if not target.get("isStage"):
+		m["sprites"] += 1
+	for block in (target.get("blocks") or {}).values():
+		# Lists are top-level variable/list reporters; shadow blocks are input placeholders
+		if not isinstance(block, dict) or block.get("shadow"):
+			continue
+		m["blocks"] += 1
+		if block.get("topLevel"):
+			m["scripts"] += 1
+		opcodes[block.get("opcode")] = opcodes.get(block.get("opcode"), 0) + 1
+	for costume in target.get("costumes") or []:
+		m["costumes"] += 1
+		assets.add(costume.get("md5ext") or costume.get("assetId"))
+	for sound in target.get("sounds") or []:
+		m["sounds"] += 1
+		assets.add(sound.get("md5ext") or sound.get("assetId"))
+		if sound.get("rate"):
+			m["sound_seconds"] += float(sound.get("sampleCount") or 0) / float(sound["rate"])
+	m["variables"] += len(target.get("variables") or {})
+	m["lists"] += len(target.get("lists") or {})
+	m["comments"] += len(target.get("comments") or {})
+
+
+def analyze_project_source(open_source) -> dict:
+	"""Metrics for one project.json; ``open_source()`` returns a fresh binary file object.
+
+	With ijson installed the sprites are parsed one at a time, so a large
+	project never has to fit in memory as a whole; otherwise (and for legacy
+	Scratch 2 projects, which have no ``targets``) the file is loaded at once.
+	"""
+	m = {"format": "sb3", "sprites": 0, "blocks": 0, "scripts": 0, "costumes": 0, "sounds": 0,
+		"sound_seconds": 0.0, "variables": 0, "lists": 0, "comments": 0}
+	opcodes, assets, extensions = {}, set(), []
+	ijson = optional_import("ijson")
+	targets = 0
+	if ijson is not None:
+		with open_source() as f:
+			for target in ijson.items(f, "targets.item"):
+				targets += 1
+				_analyze_target(m, target, opcodes, assets)
+		if targets:
+			with open_source() as f:
+				extensions = list(next(ijson.items(f, "extensions"), None) or [])
+	if not targets:
+		with open_source() as f:
+			data = json.load(f)
+		if "targets" in data:
+			for target in data["targets"]:
+				_analyze_target(m, target, opcodes, assets)
+			extensions = list(data.get("extensions") or [])
+		else:
+			# Scratch 2: sprites are "children" of the stage; scripts are [x, y, blocks] triples
+			m["format"] = "sb2"
+			m["blocks"] = None
+			for obj in [data] + [c for c in data.get("children") or [] if "objName" in c]:
+				if obj is not data:
+					m["sprites"] += 1
+				m["scripts"] += len(obj.get("scripts") or [])
+				m["costumes"] += len(obj.get("costumes") or [])
+				m["sounds"] += len(obj.get("sounds") or [])
+				m["variables"] += len(obj.get("variables") or [])
+				m["lists"] += len(obj.get("lists") or [])
+				assets.update(c.get("baseLayerMD5") for c in obj.get("costumes") or [])
+				assets.update(c.get("md5") for c in obj.get("sounds") or [])
+	assets.discard(None)
+	m["unique_opcodes"] = len(opcodes)
+	m["top_opcodes"] = dict(sorted(opcodes.items(), key=lambda kv: (-kv[1], str(kv[0])))[:5])
+	m["unique_assets"] = len(assets)
+	m["sound_seconds"] = round(m["sound_seconds"], 2)
+	m["extensions"] = extensions
+	return m
+
+
+def analyze_project_file(path) -> dict:
+	"""Analyze a downloaded project source file; runs in a worker process (see ``analyze_projects``)."""
+	import zipfile
+	if zipfile.is_zipfile(path):
+		with zipfile.ZipFile(path) as archive:
+			if "project.json" not in archive.namelist():
+				raise RuntimeError("archive has no project.json")
+			metrics = analyze_project_source(lambda: archive.open("project.json"))
+	else:
+		metrics = analyze_project_source(lambda: open(path, "rb"))
+	metrics["json_bytes"] = os.path.getsize(path)
+	return metrics
+
+
+def analyze_projects(projects, download, workers=8, processes=None, analyze=analyze_project_file):
+	"""Download and analyze many projects; yields ``(project, metrics, error)`` as each finishes.
+
+	Downloads run on ``workers`` threads, each streaming a project to a temp
+	file and handing the path to a pool of ``processes`` worker processes for
+	the CPU-bound parsing (``processes=0`` parses in the download thread).
+	``download(project, dest_dir)`` returns the file path; files are removed
+	once analyzed.
+	"""
+	import tempfile
+	pool = None
+	if processes != 0:
+		from concurrent.futures import ProcessPoolExecutor
+		pool = ProcessPoolExecutor(max_workers=processes or None)
+	tmp = tempfile.mkdtemp(prefix="scratch-analyze-")
+
+	def task(project):
+		path = download(project, tmp)
+		try:
+			return pool.submit(analyze, path).result() if pool is not None else analyze(path)
+		finally:
+			os.remove(path)
+
+	try:
+		for result in bounded_map(task, projects, workers=workers):
+			yield result
+	finally:
+		if pool is not None:
+			pool.shutdown(wait=True)
+		import shutil
+		shutil.rmtree(tmp, ignore_errors=True)
+
+
+def build_parser():
 	parser = argparse.ArgumentParser(description="Retrieve Scratch user data using scratchattach")
+	parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
 	parser.add_argument("--profile", help="Config profile name from ~/.scratchattach/config.toml")
+	parser.add_argument("--profiles", metavar="NAMES", help="Run fetch/projects/messages for several config profiles at once ('all' or comma-separated names); output is tagged by profile")
 	parser.add_argument("--login-username", help="Username to login with (for authenticated access)")
 	parser.add_argument("--login-password", help="Password for login (not recommended on shared shells)")
 	parser.add_argument("--session-string", help="Scratch session string to use for authentication")
 	parser.add_argument("--browser-login", action="store_true", help="Open browser to login and retrieve session")
 	parser.add_argument("--json", action="store_true", help="Print raw JSON output instead of pretty text")
-	parser.add_argument("--format", choices=["json", "yaml", "csv", "rich", "pretty"], help="Output format (overrides --json). If not set, human-friendly output is used.")
+	parser.add_argument("--format", choices=["json", "ndjson", "yaml", "csv", "parquet", "arrow", "rich", "pretty"], help="Output format (overrides --json). If not set, human-friendly output is used.")
 	parser.add_argument("--export", help="Write output to a file instead of printing (auto-chooses format by extension if not set)")
 	parser.add_argument("--debug", action="store_true", help="Enable debug output and warnings")
+	parser.add_argument("--timings", action="store_true", help="Print a per-phase timing breakdown (imports, config, session, command, upstream HTTP, serialization) to stderr")
+	parser.add_argument("--trace", metavar="FILE", help="Write a Chrome trace-event JSON of the run (open in chrome://tracing, Perfetto or speedscope)")
+	cassette = parser.add_mutually_exclusive_group()
+	cassette.add_argument("--record", metavar="FILE", help="Append every upstream response to this cassette file (or set $SCRATCH_RECORD)")
+	cassette.add_argument("--replay", metavar="FILE", help="Serve upstream requests from a cassette recorded with --record, offline (or set $SCRATCH_REPLAY)")
 	parser.add_argument("--forget-session", action="store_true", help="Forget saved session (~/.scratchattach_session) and exit")
+	parser.add_argument("--no-cache", action="store_true", help="Do not read or write the local response cache (~/.scratchattach/cache.sqlite)")
+	parser.add_argument("--refresh", action="store_true", help="Ignore cached responses but store the fresh results")
+	parser.add_argument("--rate", type=float, help="Max upstream requests per second (default 10 or $SCRATCH_RATE; 0 disables throttling)")
+	parser.add_argument("--burst", type=int, help="Requests allowed in a burst before --rate applies (default 20 or $SCRATCH_BURST)")
+	parser.add_argument("--pool-size", type=int, help="Kept-alive HTTP connections per host in the shared pool (default: 16, or --workers if higher)")
+	parser.add_argument("--no-keep-alive", action="store_true", help="Close HTTP connections after each request instead of reusing them")
+	parser.add_argument("--no-compression", action="store_true", help="Ask for uncompressed HTTP responses (default: gzip/deflate, plus br/zstd when installed)")
+	parser.add_argument("--retries", type=int, default=MAX_RETRIES, help="Retries with jittered exponential backoff on HTTP 429/5xx and connection errors")
+	parser.add_argument("--no-daemon", action="store_true", help="Do not forward queries to a running `serve` daemon")
+	parser.add_argument("--store", help=f"Also upsert fetched users/projects/messages into this SQLite database (`query` reads it; default {STORE_FILE})")
+	parser.add_argument("--images", metavar="DIR", help="Download user icons (fetch) and project thumbnails (projects) into this content-addressed image store")
+	parser.add_argument("--image-workers", type=int, default=8, help="Concurrent image downloads for --images")
 
-	# Subcommands: fetch (default), projects, messages
+	# Subcommands: fetch (default), projects, messages, serve, crawl, watch, query, analyze
 	subparsers = parser.add_subparsers(dest="command", help="Subcommands")
 
 	sp_fetch = subparsers.add_parser("fetch", help="Fetch user profile data")
-	sp_fetch.add_argument("username", nargs="?", help="Scratch username to fetch")
+	sp_fetch.add_argument("username", nargs="*", help="Scratch username(s) to fetch")
+	sp_fetch.add_argument("--file", help="Read usernames from a file, one per line ('-' reads stdin)")
+	sp_fetch.add_argument("--workers", type=int, default=8, help="Concurrent lookups when fetching several users (in-flight requests with --async)")
+	sp_fetch.add_argument("--async", dest="use_async", action="store_true", help="Use the asyncio engine for bulk fetches (suited to hundreds of concurrent lookups)")
+	sp_fetch.add_argument("--ordered", action="store_true", help="Emit bulk results in input order instead of as they finish")
+	sp_fetch.add_argument("--resume", action="store_true", help="Continue an interrupted bulk export (NDJSON/CSV --export), skipping users already written")
+	sp_fetch.add_argument("--checkpoint", metavar="FILE", help="Progress log for --resume (default: <export>.checkpoint)")
 
 	sp_projects = subparsers.add_parser("projects", help="List projects for a user")
 	sp_projects.add_argument("username", nargs="?", help="Scratch username to list projects for")
-	sp_projects.add_argument("--limit", type=int, default=20, help="Limit number of projects shown")
+	sp_projects.add_argument("--limit", type=int, default=20, help="Limit number of projects fetched and shown (0 streams all projects)")
+	sp_projects.add_argument("--details", action="store_true", help="Look up each project's full record (stats, instructions, notes) concurrently and merge it in")
+	sp_projects.add_argument("--detail-workers", type=int, default=8, help="Concurrent project lookups for --details")
+	sp_projects.add_argument("--resume", action="store_true", help="Continue an interrupted export (NDJSON/CSV --export) after the last project written")
+	sp_projects.add_argument("--checkpoint", metavar="FILE", help="Progress log for --resume (default: <export>.checkpoint)")
 
 	sp_messages = subparsers.add_parser("messages", help="Show message info for a user (auth required)")
 	sp_messages.add_argument("username", nargs="?", help="Scratch username to show messages for")
+	sp_messages.add_argument("--limit", type=int, default=20, help="Stop after this many messages (0 for no limit)")
+	sp_messages.add_argument("--all", action="store_true", help=f"Ignore the last-seen cursor ({MESSAGE_CURSOR_FILE}) and list from the newest message")
+
+	sp_serve = subparsers.add_parser("serve", help="Run a long-lived daemon that answers fetch/projects/messages queries")
+	sp_serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: localhost only)")
+	sp_serve.add_argument("--port", type=int, default=8765, help="Port to listen on (0 picks a free port)")
+
+	sp_watch = subparsers.add_parser("watch", help="Poll users (and your messages) and print only what changed")
+	sp_watch.add_argument("username", nargs="*", help="Scratch username(s) to watch")
+	sp_watch.add_argument("--file", help="Read usernames from a file, one per line ('-' reads stdin)")
+	sp_watch.add_argument("--interval", type=float, default=60, help="Seconds between polls of an entity that is changing (default 60)")
+	sp_watch.add_argument("--max-interval", type=float, default=3600, help="Upper bound for the back-off of entities that do not change (default 3600)")
+	sp_watch.add_argument("--messages", action="store_true", help="Also watch the logged-in account's messages (auth required)")
+	sp_watch.add_argument("--polls", type=int, default=0, help="Stop after this many polls (default 0: run until interrupted)")
+
+	sp_query = subparsers.add_parser("query", help="Query the local --store database instead of Scratch")
+	sp_query.add_argument("table", choices=["users", "projects", "messages"], help="What to list")
+	sp_query.add_argument("--country", help="users: exact country (case-insensitive)")
+	sp_query.add_argument("--joined-after", help="users: join date after this ISO date or prefix (e.g. 2015 or 2015-06-01)")
+	sp_query.add_argument("--joined-before", help="users: join date before this ISO date or prefix")
+	sp_query.add_argument("--username", help="users: SQL LIKE pattern; projects: author; messages: account")
+	sp_query.add_argument("--min-views", type=int, help="projects: at least this many views")
+	sp_query.add_argument("--limit", type=int, help="Return at most this many rows")
+
+	sp_crawl = subparsers.add_parser("crawl", help="Walk follower/following edges breadth-first from seed users and stream the edge list")
+	sp_crawl.add_argument("username", nargs="*", help="Seed username(s)")
+	sp_crawl.add_argument("--file", help="Read seed usernames from a file, one per line ('-' reads stdin)")
+	sp_crawl.add_argument("--depth", type=int, default=1, help="How many hops from the seeds to expand (default 1)")
+	sp_crawl.add_argument("--relation", choices=["followers", "following", "both"], default="both", help="Which edges to follow")
+	sp_crawl.add_argument("--workers", type=int, default=8, help="Concurrent page fetches")
+	sp_crawl.add_argument("--state", default="crawl.sqlite", help="Crawl state database (visited set and frontier)")
+	sp_crawl.add_argument("--resume", action="store_true", help="Continue the crawl saved in --state and append to --export")
+
+	sp_analyze = subparsers.add_parser("analyze", help="Download project sources and report block, sprite and asset metrics per project")
+	sp_analyze.add_argument("username", nargs="*", help="Analyze these users' projects")
+	sp_analyze.add_argument("--file", help="Read usernames from a file, one per line ('-' reads stdin)")
+	sp_analyze.add_argument("--project", type=int, action="append", default=[], metavar="ID", help="Also analyze this project id (repeatable)")
+	sp_analyze.add_argument("--limit", type=int, default=20, help="Projects per user (0 for all)")
+	sp_analyze.add_argument("--workers", type=int, default=8, help="Concurrent downloads")
+	sp_analyze.add_argument("--processes", type=int, help="Analysis worker processes (default: one per CPU; 0 analyzes in the download threads)")
+
+	return parser
+
 
-	args = parser.parse_args()
+def forget_session():
+	"""Remove the saved session file (``--forget-session``)."""
+	p = os.path.expanduser(SESSION_FILE)
+	try:
+		if os.path.exists(p):
+			os.remove(p)
+			print(f"Removed saved session: {p}")
+		else:
+			print("No saved session found.")
+	except Exception as e:
+		print("Failed to remove saved session:", e)
+
+
+def main(argv=None):
+	args = build_parser().parse_args(argv)
+	# Handled before .env is loaded: --forget-session needs neither python-dotenv nor scratchattach
+	if args.forget_session:
+		forget_session()
+		return
+	if args.timings or args.trace:
+		enable_timings()
+	phase("env")
+	# .env is loaded after parsing so --help/--version never import python-dotenv
+	load_env_file()
+	if args.rate is None:
+		args.rate = float(os.environ.get("SCRATCH_RATE", 10))
+	if args.burst is None:
+		args.burst = int(os.environ.get("SCRATCH_BURST", 20))
+	configure_rate_limit(args.rate, args.burst, args.retries)
+	try:
+		use_cassette(args.record, args.replay)
+	except OSError as e:
+		print(f"Cannot open cassette: {e}")
+		return
+	# Applied when scratchattach is first loaded (see configure_http_pool)
+	HTTP_POOL_SETTINGS.update(
+		pool_size=args.pool_size or max(HTTP_POOL_SETTINGS["pool_size"], getattr(args, "workers", 0) or 0),
+		keep_alive=not args.no_keep_alive,
+		compress=not args.no_compression,
+	)
+	try:
+		run(args)
+	finally:
+		if CASSETTE is not None:
+			CASSETTE.close()
+			if args.debug:
+				print(f"[debug] cassette {CASSETTE.path} ({CASSETTE.mode}): {CASSETTE.hits} replayed", file=sys.stderr)
+		if TIMINGS is not None:
+			phase(None)
+			if args.timings:
+				print(TIMINGS.summary(), file=sys.stderr)
+			if args.trace:
+				with open(args.trace, "w", encoding="utf-8") as f:
+					json.dump(TIMINGS.chrome_trace(), f)
+		if args.debug:
+			print("[debug]", REQUEST_STATS.summary(), file=sys.stderr)
+			if HTTP_POOL is not None:
+				pool = connection_stats()
+				print(f"[debug] HTTP pool: {pool['requests']} request(s) over {pool['connections']} connection(s), "
+					f"{pool['reused']} reused", file=sys.stderr)
+			if RATE_LIMITER is not None:
+				print("[debug] rate limiter:", json.dumps(RATE_LIMITER.stats()), file=sys.stderr)
 
-	username = getattr(args, "username", None) or os.environ.get("SCRATCH_USERNAME")
+
+def run(args):
+	"""Execute the parsed command line."""
+	# `fetch` accepts several usernames; more than one (or --file) switches to bulk mode
+	bulk = False
+	username = getattr(args, "username", None)
+	if getattr(args, "command", None) in ("crawl", "watch", "query", "analyze"):
+		# The user lists are read in their own branches
+		username = None
+	elif isinstance(username, list):
+		bulk = len(username) > 1 or bool(getattr(args, "file", None))
+		username = username[0] if len(username) == 1 else None
+	username = username or os.environ.get("SCRATCH_USERNAME")
 	login_user = args.login_username or os.environ.get("SCRATCH_LOGIN_USERNAME")
 	login_pass = args.login_password or os.environ.get("SCRATCH_LOGIN_PASSWORD")
 	session_string = args.session_string or os.environ.get("SCRATCH_SESSION_STRING")
 	profile_name = args.profile or os.environ.get("SCRATCH_PROFILE")
 
 	# Load optional config file (~/.scratchattach/config.toml) and apply profile defaults
+	phase("config")
 	config = {}
 	try:
 		# Prefer stdlib tomllib (Python 3.11+)
@@ -126,103 +2987,339 @@ def main():
 			if not login_pass and prof.get("login_password"):
 				login_pass = prof.get("login_password")
 
-	# If user asked to forget the saved session, remove it and exit
-	if args.forget_session:
-		p = os.path.expanduser("~/.scratchattach_session")
+	# `query`: answer from the local snapshot store, no network
+	if getattr(args, "command", None) == "query":
+		phase("query")
+		path = os.path.expanduser(args.store or STORE_FILE)
+		if not os.path.exists(path):
+			print(f"No snapshot store at {path}; fetch with --store first")
+			return
+		store = SnapshotStore(path)
 		try:
-			if os.path.exists(p):
-				os.remove(p)
-				print(f"Removed saved session: {p}")
+			rows = store.query(args.table, **build_store_query(args))
+			export_path = getattr(args, "export", None)
+			fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path, default="json" if export_path else None)
+			if fmt in WRITERS:
+				fields = {"users": USER_FIELDS, "projects": PROJECT_FIELDS}.get(args.table)
+				with open_writer(fmt, export_path, fieldnames=fields) as writer:
+					writer.write_many(rows)
+				if export_path:
+					print(f"Wrote {writer.count} record(s) as {fmt.upper()} to {export_path}")
 			else:
-				print("No saved session found.")
+				n = 0
+				for n, row in enumerate(rows, 1):
+					if args.table == "users":
+						print(f"{row.get('username')} (id: {row.get('id')}) country: {row.get('country')}, joined: {row.get('join_date')}")
+					elif args.table == "projects":
+						print(f"- {row.get('title') or row.get('id')} ({row.get('views')} views)")
+					else:
+						print(f"- {message_summary(row)}")
+				print(f"{n} {args.table}", file=sys.stderr)
+		except Exception as e:
+			print("Query failed:", describe_error(e))
+		finally:
+			store.close()
+		return
+
+	phase("setup")
+	# With a `serve` daemon running, this process is a thin client: the daemon already
+	# holds a logged-in session and warm caches. Explicit credentials or cache flags
+	# apply to this process only, so they bypass the daemon.
+	backend = None
+	if (getattr(args, "command", None) in (None, "fetch", "projects", "messages") and not args.no_daemon
+			and not (session_string or login_user or args.browser_login or args.no_cache or args.refresh or args.profiles)
+			and CASSETTE is None):
+		backend = DaemonClient.discover()
+		if backend is not None and args.debug:
+			print("[debug] forwarding queries to daemon at", backend.url, file=sys.stderr)
+
+	# Local response cache; TTLs (seconds) and size can be tuned in a [cache] table in config.toml.
+	# A cassette bypasses it: recordings must see every request, and replays must not
+	# leave recorded data in the persistent cache.
+	cache = None
+	if backend is None and not args.no_cache and CASSETTE is None:
+		cache_cfg = config.get("cache", {}) if isinstance(config, dict) else {}
+		try:
+			cache = ResponseCache(
+				path=cache_cfg.get("path"),
+				ttls={k[len("ttl_"):]: v for k, v in cache_cfg.items() if k.startswith("ttl_")},
+				max_entries=cache_cfg.get("max_entries", 10000),
+				refresh=args.refresh,
+			)
+		except Exception as e:
+			if args.debug:
+				print("Response cache disabled:", e, file=sys.stderr)
+			cache = None
+
+	# `--profiles`: the same command for several accounts at once, merged into one tagged stream
+	if args.profiles and getattr(args, "command", None) in (None, "fetch", "projects", "messages"):
+		phase("profiles")
+		try:
+			profiles = select_profiles(config, args.profiles)
+		except KeyError as e:
+			print(f"Unknown profile {e} in ~/.scratchattach/config.toml")
+			return
+		if not profiles:
+			print("No profiles found in ~/.scratchattach/config.toml")
+			return
+		if not args.debug:
+			warnings.filterwarnings("ignore", category=scratchattach.LoginDataWarning)
+		export_path = getattr(args, "export", None)
+		fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path, default="ndjson")
+		if fmt not in WRITERS:
+			fmt = "ndjson" if not export_path else "json"
+		command = getattr(args, "command", None) or "fetch"
+		fields = {"projects": ["profile"] + PROJECT_FIELDS, "messages": None}.get(command, ["profile"] + USER_FIELDS + ["error"])
+		try:
+			writer = open_writer(fmt, export_path, fieldnames=fields)
 		except Exception as e:
-			print("Failed to remove saved session:", e)
+			print(e)
+			return
+
+		def emit(record):
+			writer.write(record)
+			writer.flush()
+
+		try:
+			# Only an explicit username applies to every profile; otherwise each uses its own
+			explicit = getattr(args, "username", None)
+			if isinstance(explicit, list):
+				explicit = explicit[0] if len(explicit) == 1 else None
+			failed = run_profiles(profiles, command, emit, username=explicit, limit=getattr(args, "limit", 20),
+				cache=cache, rate=args.rate, burst=args.burst)
+		except KeyboardInterrupt:
+			failed = 0
+			print("Interrupted; partial results kept.", file=sys.stderr)
+		finally:
+			writer.close()
+			if cache is not None:
+				cache.close()
+		if export_path:
+			print(f"Wrote {writer.count} record(s) from {len(profiles)} profile(s) to {export_path}")
+		if failed:
+			print(f"{failed} of {len(profiles)} profile(s) failed", file=sys.stderr)
 		return
 
+	# Optional snapshot store: fetched users/projects/messages are also upserted locally
+	store = None
+	if args.store and getattr(args, "command", None) in (None, "fetch", "projects", "messages"):
+		try:
+			store = SnapshotStore(args.store)
+		except Exception as e:
+			print("Snapshot store disabled:", e, file=sys.stderr)
+
+	# Optional image downloads: icons/thumbnails are fetched in the background as records stream out
+	images = None
+	if args.images and getattr(args, "command", None) in (None, "fetch", "projects"):
+		try:
+			images = ImageDownloader(ImageStore(args.images), workers=args.image_workers)
+		except Exception as e:
+			print("Image downloads disabled:", e, file=sys.stderr)
+
+	def finish_images():
+		if images is None:
+			return
+		stats = images.close()
+		print(f"Images: {stats['downloaded']} downloaded, {stats['deduplicated']} deduplicated, "
+			f"{stats['not-modified']} unchanged" + (f", {stats['failed']} failed" if stats["failed"] else "")
+			+ f" ({args.images})", file=sys.stderr)
+
 	# By default, suppress scratchattach LoginDataWarning unless --debug
 	try:
-		if not args.debug:
+		if backend is None and not args.debug:
 			warnings.filterwarnings('ignore', category=scratchattach.LoginDataWarning)
 	except Exception:
 		pass
 
-	if not username:
+	# `crawl`: BFS over follower/following edges, streaming "source follows target" edges
+	if getattr(args, "command", None) == "crawl":
+		phase("crawl")
+		state = CrawlState(args.state, reset=not args.resume)
+		if args.resume and state.get_meta("depth") is not None:
+			depth, relations = state.get_meta("depth"), tuple(state.get_meta("relations"))
+			seeds = []
+		else:
+			depth = args.depth
+			relations = CRAWL_RELATIONS if args.relation == "both" else (args.relation,)
+			state.set_meta("depth", depth)
+			state.set_meta("relations", list(relations))
+			seeds = list(read_usernames(args.username, args.file))
+			if not seeds:
+				print("crawl needs at least one seed username (arguments or --file)")
+				state.close()
+				return
+		export_path = getattr(args, "export", None)
+		fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path, default="ndjson")
+		if fmt not in WRITERS:
+			fmt = "ndjson"
+		try:
+			writer = open_writer(fmt, export_path, fieldnames=["source", "target", "depth"], mode="a" if args.resume else "w")
+		except Exception as e:
+			print(e)
+			state.close()
+			return
+		stats = None
+		try:
+			stats = crawl_graph(seeds, state, writer.write, depth=depth, relations=relations, workers=args.workers, flush=writer.flush)
+		except KeyboardInterrupt:
+			print(f"Interrupted; resume with --resume --state {args.state}", file=sys.stderr)
+		finally:
+			writer.close()
+			counts = state.counts()
+			state.close()
+		if stats is not None:
+			print(f"Crawled {stats['pages']} page(s): {stats['edges']} edge(s), {counts['visited']} user(s) seen"
+				+ (f", {stats['failed']} failed" if stats["failed"] else ""), file=sys.stderr)
+		return
+
+	# Bulk `fetch`: resolve many usernames concurrently and stream one record per user
+	if bulk:
+		phase("fetch")
+		# read_usernames is consumed lazily inside the worker pool, so check the file up front
+		# (and before an --export file is truncated)
+		file_path = getattr(args, "file", None)
+		if file_path and file_path != "-":
+			try:
+				open(file_path, "r", encoding="utf-8").close()
+			except OSError as e:
+				print(f"Cannot read usernames from {file_path}: {e.strerror or e}")
+				return
+		export_path = getattr(args, "export", None)
+		fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path, default="ndjson")
+		if export_path and fmt not in WRITERS:
+			# Pretty text is not exported; write the records as JSON instead
+			fmt = "json"
+		# Exports that can be appended to keep a checkpoint log so --resume can continue them
+		resume = getattr(args, "resume", False)
+		checkpoint = None
+		if export_path and WRITERS.get(fmt) is not None and WRITERS[fmt].appendable:
+			try:
+				checkpoint = Checkpoint(getattr(args, "checkpoint", None) or export_path + ".checkpoint", export_path, resume=resume)
+			except RuntimeError as e:
+				print(e)
+				return
+		elif resume:
+			print("--resume needs an NDJSON or CSV --export file")
+			return
+		writer = None
+		if fmt in WRITERS:
+			try:
+				writer = open_writer(fmt, export_path, fieldnames=USER_FIELDS + ["error"], mode="a" if resume else "w")
+			except Exception as e:
+				print(e)
+				if checkpoint is not None:
+					checkpoint.close()
+				return
+		names = read_usernames(args.username, file_path)
+		counts = {"n": 0, "failed": 0, "skipped": 0}
+		if checkpoint is not None and checkpoint.done:
+			def pending(names):
+				for name in names:
+					if checkpoint.cursor(name) is None:
+						yield name
+					else:
+						counts["skipped"] += 1
+			names = pending(names)
+
+		def emit(name, data, err):
+			counts["n"] += 1
+			record = data if err is None else {"username": name, "error": describe_error(err)}
+			if err is not None:
+				counts["failed"] += 1
+			if store is not None and err is None:
+				store.add_user(data)
+			if images is not None and err is None:
+				images.submit(data.get("icon_url"))
+			if checkpoint is not None:
+				writer.write(record)
+				checkpoint.commit(name, writer)
+			elif writer is not None:
+				writer.write(record)
+				writer.flush()
+			elif err is not None:
+				print(f"{name}: Error: {describe_error(err)}", flush=True)
+			else:
+				print(f"{data.get('username')} (id: {data.get('id')}) country: {data.get('country')}, joined: {data.get('join_date')}", flush=True)
+
+		fetch_one = (backend or LocalBackend(cache=cache)).user
+		complete = False
+		try:
+			if args.use_async:
+				async def consume():
+					fetcher = AsyncFetcher(concurrency=args.workers, fetch=fetch_one)
+					try:
+						async for result in fetcher.users(names, ordered=args.ordered):
+							emit(*result)
+					finally:
+						fetcher.close()
+				import asyncio
+				asyncio.run(consume())
+			else:
+				for result in fetch_users_bulk(names, workers=args.workers, ordered=args.ordered, fetch=fetch_one):
+					emit(*result)
+			complete = True
+		except KeyboardInterrupt:
+			print("Interrupted; partial results kept" + ("; continue with --resume." if checkpoint is not None else "."), file=sys.stderr)
+		finally:
+			if writer is not None:
+				writer.close()
+			if checkpoint is not None:
+				checkpoint.close(complete=complete)
+			if store is not None:
+				store.close()
+			finish_images()
+		n, failed = counts["n"], counts["failed"]
+		if counts["skipped"]:
+			print(f"Skipped {counts['skipped']} user(s) already in {export_path}")
+		if export_path:
+			print(f"Wrote {n} user(s) to {export_path}")
+		if failed:
+			print(f"{failed} of {n} user(s) failed", file=sys.stderr)
+		return
+
+	if not username and getattr(args, "command", None) not in ("serve", "watch", "analyze"):
 		username = input("Scratch username to fetch: ").strip()
 
+	phase("session")
 	session = None
-	# Try to create an authenticated session if credentials/session provided
-	# If no session-string provided, try loading saved session from file
-	def session_file_path():
-		return os.path.expanduser("~/.scratchattach_session")
+	# When the session was last validated upstream; refreshes only happen once this expires
+	validated_at = None
+
+	def revalidate(ses):
+		# A rejected session fails the login; transient problems (429 after retries,
+		# network errors, a busy lock) keep it and leave the check for a later run
+		try:
+			return ensure_fresh_session(ses)
+		except SessionExpired:
+			raise
+		except Exception as e:
+			if is_auth_failure(e):
+				raise
+			if args.debug:
+				print("[debug] session check skipped:", describe_error(e), file=sys.stderr)
+			return None
 
 	def load_saved_session():
-		p = session_file_path()
-		if not os.path.exists(p):
+		data = read_session_file()
+		if not data:
 			# try keyring as a fallback when enabled
-			if HAVE_KEYRING and os.environ.get("SCRATCH_USE_KEYRING") == "1":
+			if have_keyring() and os.environ.get("SCRATCH_USE_KEYRING") == "1":
 				try:
-					val = keyring.get_password("scratchattach", "session")
+					val = optional_import("keyring").get_password("scratchattach", "session")
 					if val:
 						return ("session_string", val)
 				except Exception:
 					pass
 			return None
-		try:
-			with open(p, "r", encoding="utf-8") as f:
-				data = json.load(f)
-			# Prefer session_string if present
-			if data.get("session_string"):
-				return ("session_string", data.get("session_string"))
-			if data.get("session_id"):
-				return ("session_id", data.get("session_id"), data.get("username"))
-		except Exception:
-			return None
+		# Prefer session_string if present
+		if data.get("session_string"):
+			return ("session_string", data.get("session_string"))
+		if data.get("session_id"):
+			return ("session_id", data.get("session_id"), data.get("username"))
 		return None
 
-	def save_session_info(ses):
-		p = session_file_path()
-		info = {}
-		# Try to get a full session_string first
-		try:
-			if getattr(ses, "session_string", None):
-				info["session_string"] = ses.session_string
-		except Exception:
-			pass
-		# Fallback to session id + username
-		try:
-			if getattr(ses, "id", None):
-				info.setdefault("session_id", ses.id)
-			if getattr(ses, "username", None):
-				info.setdefault("username", ses.username)
-		except Exception:
-			pass
-		try:
-			# write file with restrictive permissions
-			umask = os.umask(0)
-			with open(p, "w", encoding="utf-8") as f:
-				json.dump(info, f)
-			os.umask(umask)
-			try:
-				os.chmod(p, 0o600)
-			except Exception:
-				pass
-			return True
-		except Exception:
-			return False
-
-
-		# helper to save into keyring when requested
-		def save_session_keyring(session_string):
-			if not HAVE_KEYRING:
-				return False
-			try:
-				keyring.set_password("scratchattach", "session", session_string)
-				return True
-			except Exception:
-				return False
-
-	# Attempt to load saved session if user didn't provide one explicitly
-	if not session_string and not login_user and not args.browser_login:
+	# Attempt to load saved session if user didn't provide one explicitly (a daemon has its own)
+	if backend is None and not session_string and not login_user and not args.browser_login:
 		saved = load_saved_session()
 		if saved:
 			if saved[0] == "session_string":
@@ -233,57 +3330,149 @@ def main():
 				saved_username = saved[2] if len(saved) > 2 else None
 				try:
 					session = scratchattach.login_by_id(session_id, username=saved_username)
+					validated_at = revalidate(session)
 					print("Loaded session from file for:", getattr(session, "username", None))
 				except Exception as e:
+					session = None
 					print("Failed to load saved session by id:", e)
 	if session_string:
 		try:
 			session = scratchattach.login_by_session_string(session_string)
-			# Attempt to refresh session if supported by scratchattach
-			try:
-				if hasattr(session, "refresh"):
-					session.refresh()
-			except Exception:
-				pass
+			# Re-validate upstream only when the saved validation has expired
+			validated_at = revalidate(session)
 			print("Logged in via session string as:", getattr(session, "username", None))
 		except Exception as e:
+			session = None
 			print("Session-string login failed:", e)
 	elif login_user and login_pass:
 		try:
+			# A fresh login is already validated; no extra refresh round-trip
 			session = scratchattach.login(login_user, login_pass)
-			# attempt refresh if available
-			try:
-				if hasattr(session, "refresh"):
-					session.refresh()
-			except Exception:
-				pass
+			validated_at = time.time()
 			print("Logged in via username/password as:", getattr(session, "username", None))
 		except Exception as e:
 			print("Username/password login failed:", e)
 	elif args.browser_login:
 		try:
 			session = scratchattach.login_from_browser()
-			# attempt refresh if session exposes it
-			try:
-				if hasattr(session, "refresh"):
-					session.refresh()
-			except Exception:
-				pass
+			validated_at = time.time()
 			print("Logged in via browser as:", getattr(session, "username", None))
 		except Exception as e:
 			print("Browser login failed:", e)
 
+	phase(getattr(args, "command", None) or "fetch")
+	# `serve`: keep this session and the caches alive and answer queries until interrupted
+	if getattr(args, "command", None) == "serve":
+		try:
+			serve(LocalBackend(session, TieredCache(MemoryCache(), cache), session_file=SESSION_FILE), host=args.host, port=args.port, verbose=args.debug)
+		except OSError as e:
+			print("Could not start daemon:", e)
+		finally:
+			if cache is not None:
+				cache.close()
+		return
+
+	# `watch`: poll profiles (uncached) and the session's inbox, emitting one record per change
+	if getattr(args, "command", None) == "watch":
+		names = list(read_usernames(args.username, args.file))
+		if args.messages and session is None:
+			print("Watching messages requires an authenticated session. Provide --session-string, --login-username/--login-password, or --browser-login.")
+			return
+		if not names and not args.messages:
+			print("watch needs at least one username (arguments or --file) or --messages")
+			return
+		export_path = getattr(args, "export", None)
+		fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path, default="ndjson")
+		if fmt not in WRITERS:
+			fmt = "ndjson"
+		try:
+			writer = open_writer(fmt, export_path)
+		except Exception as e:
+			print(e)
+			return
+
+		def emit(event):
+			writer.write(event)
+			writer.flush()
+
+		watcher = Watcher(emit, interval=args.interval, max_interval=args.max_interval)
+		for name in names:
+			watcher.add(f"user:{name}", user_poller(name))
+		if args.messages:
+			watcher.add("messages", messages_poller(session))
+		try:
+			watcher.run(max_polls=args.polls)
+		except KeyboardInterrupt:
+			pass
+		finally:
+			writer.close()
+		return
+
+	if backend is None:
+		backend = LocalBackend(session, cache, session_file=SESSION_FILE)
+
+	# `analyze`: download project sources on threads, parse them in worker processes
+	if getattr(args, "command", None) == "analyze":
+		names = list(read_usernames(args.username, args.file))
+		if not names and not args.project:
+			print("analyze needs usernames (arguments or --file) or --project IDs")
+			return
+		export_path = getattr(args, "export", None)
+		fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path, default="json" if export_path else None)
+		writer = None
+		if fmt in WRITERS:
+			try:
+				writer = open_writer(fmt, export_path, fieldnames=ANALYSIS_FIELDS)
+			except Exception as e:
+				print(e)
+				return
+
+		def sources():
+			for pid in args.project:
+				yield {"id": pid}
+			for name in names:
+				try:
+					for p in backend.projects(name, limit=args.limit):
+						yield {"id": p.get("id"), "title": p.get("title"), "author": p.get("author_name") or name}
+				except Exception as e:
+					print(f"{name}: Error listing projects: {describe_error(e)}", file=sys.stderr)
+
+		def download(project, dest_dir):
+			return download_project_json(project["id"], dest_dir, session=session)
+
+		counts = {"n": 0, "failed": 0}
+		try:
+			for project, metrics, err in analyze_projects(sources(), download, workers=args.workers, processes=args.processes):
+				counts["n"] += 1
+				record = {**project, **(metrics or {})}
+				if err is not None:
+					counts["failed"] += 1
+					record["error"] = describe_error(err)
+				if writer is not None:
+					writer.write(record)
+					writer.flush()
+				elif err is not None:
+					print(f"{project['id']}: Error: {record['error']}", flush=True)
+				else:
+					label = f"{project['id']} ({project['title']})" if project.get("title") else str(project["id"])
+					print(f"{label}: {record['sprites']} sprite(s), "
+						f"{record['blocks'] if record['blocks'] is not None else '?'} block(s) in {record['scripts']} script(s), "
+						f"{record['unique_assets']} asset(s)" + (f", extensions: {', '.join(record['extensions'])}" if record["extensions"] else ""), flush=True)
+		except KeyboardInterrupt:
+			print("Interrupted; partial results kept.", file=sys.stderr)
+		finally:
+			if writer is not None:
+				writer.close()
+		if export_path and writer is not None:
+			print(f"Wrote {counts['n']} project(s) to {export_path}")
+		if counts["failed"]:
+			print(f"{counts['failed']} of {counts['n']} project(s) failed", file=sys.stderr)
+		return
+
 	# Helper: serialize or write output according to requested format
 	def _write_output(obj, fmt=None, export_path=None):
 		# Determine format
-		fmt = fmt or ("json" if args.json else None)
-		if not fmt and export_path:
-			if export_path.endswith(".json"):
-				fmt = "json"
-			elif export_path.endswith(".yaml") or export_path.endswith(".yml"):
-				fmt = "yaml"
-			elif export_path.endswith(".csv"):
-				fmt = "csv"
+		fmt = resolve_format(fmt or ("json" if args.json else None), export_path)
 		# JSON
 		if fmt == "json":
 			out = json.dumps(obj, indent=2, default=str)
@@ -309,52 +3498,30 @@ def main():
 				return
 			print(out)
 			return
-		# CSV: simple heuristics
-		if fmt == "csv":
-			import csv
-			# If top-level is a list of dicts, write table
-			if isinstance(obj, list):
-				rows = []
-				headers = set()
-				for item in obj:
-					if isinstance(item, dict):
-						headers.update(item.keys())
-						rows.append(item)
-				headers = list(headers)
-				if export_path:
-					with open(export_path, "w", newline="", encoding="utf-8") as f:
-						w = csv.DictWriter(f, fieldnames=headers)
-						w.writeheader()
-						for r in rows:
-							w.writerow({k: v for k, v in r.items()})
-					print(f"Wrote CSV to {export_path}")
-					return
-				w = csv.DictWriter(sys.stdout, fieldnames=headers)
-				w.writeheader()
-				for r in rows:
-					w.writerow({k: v for k, v in r.items()})
+		# NDJSON / CSV / columnar: lists are streamed through the record writers (stable columns)
+		if fmt in ("ndjson", "csv", "parquet", "arrow"):
+			if isinstance(obj, dict) and fmt == "csv":
+				# A single dict becomes key,value pairs
+				obj = [{"key": k, "value": v} for k, v in obj.items()]
+			elif isinstance(obj, dict):
+				obj = [obj]
+			if not isinstance(obj, list):
+				print(f"{fmt.upper()} output not available for this data structure")
 				return
-			# If dict, write key,value pairs
-			if isinstance(obj, dict):
-				if export_path:
-					with open(export_path, "w", newline="", encoding="utf-8") as f:
-						w = csv.writer(f)
-						w.writerow(["key", "value"])
-						for k, v in obj.items():
-							w.writerow([k, v])
-					print(f"Wrote CSV to {export_path}")
-					return
-				w = csv.writer(sys.stdout)
-				w.writerow(["key", "value"])
-				for k, v in obj.items():
-					w.writerow([k, v])
+			try:
+				w = open_writer(fmt, export_path)
+			except RuntimeError as e:
+				print(e)
 				return
-			print("CSV output not available for this data structure")
+			with w:
+				w.write_many(item for item in obj if isinstance(item, dict))
+			if export_path:
+				print(f"Wrote {fmt.upper()} to {export_path}")
 			return
 
 		# Rich/pretty
 		if fmt in ("rich", "pretty") or (fmt is None and not args.json):
-			if HAVE_RICH and fmt == "rich":
+			if have_rich() and fmt == "rich":
 				# Let existing rich output path handle it (fall-through)
 				pass
 			if export_path:
@@ -366,118 +3533,174 @@ def main():
 			# No export and not JSON: let main pretty-print path handle it (return False)
 			return False
 
+	# Helper: stream records (one at a time) in the requested format; returns False for pretty output
+	def _write_stream(records, fmt=None, export_path=None, envelope=None, fieldnames=None, checkpoint=None, key=None, start=0):
+		fmt = resolve_format(fmt or ("json" if args.json else None), export_path, default="json" if export_path else None)
+		pretty_export = False
+		if fmt not in WRITERS:
+			if not export_path:
+				return False
+			# Pretty text is not exported; fall back to JSON like _write_output does
+			fmt, pretty_export = "json", True
+		try:
+			writer = open_writer(fmt, export_path, envelope=envelope, fieldnames=fieldnames, mode="a" if start else "w")
+		except Exception as e:
+			print(e)
+			return
+		with writer:
+			if checkpoint is None:
+				writer.write_many(records)
+			else:
+				# The cursor is the number of records exported so far for ``key``
+				for n, record in enumerate(records, start + 1):
+					writer.write(record)
+					checkpoint.commit(key, writer, n)
+				checkpoint.commit(key, writer, "end")
+		if export_path:
+			note = " (pretty export requested)" if pretty_export else ""
+			print(f"Wrote {writer.count} record(s) as {fmt.upper()} to {export_path}{note}")
+
 	# Handle `projects` subcommand: list projects for the given user (best-effort)
 	if getattr(args, "command", None) == "projects":
 		if not username:
 			username = input("Scratch username to list projects for: ").strip()
-		try:
-			user = scratchattach.get_user(username)
-			ok = user.update()
-			if not ok:
-				raise RuntimeError(f"Failed to fetch data for user '{username}': {ok}")
-			projs = None
+		export_path = getattr(args, "export", None)
+		fmt = resolve_format(getattr(args, "format", None) or ("json" if args.json else None), export_path)
+		limit = getattr(args, "limit", 20)
+		resume = getattr(args, "resume", False)
+		checkpoint = None
+		offset = 0
+		if export_path and WRITERS.get(fmt) is not None and WRITERS[fmt].appendable:
 			try:
-				if hasattr(user, "projects"):
-					projs = user.projects()
-				elif hasattr(user, "get_projects"):
-					projs = user.get_projects()
-				else:
-					projs = getattr(user, "projects", None)
-			except Exception:
-				projs = None
-
-			limit = getattr(args, "limit", 20)
-			out_obj = {"username": username, "projects": projs}
-			# honor requested format/export
-			if _write_output(out_obj, fmt=getattr(args, "format", None), export_path=getattr(args, "export", None)) is False:
+				checkpoint = Checkpoint(getattr(args, "checkpoint", None) or export_path + ".checkpoint", export_path, resume=resume)
+			except RuntimeError as e:
+				print(e)
+				return
+			cursor = checkpoint.cursor(username, "0")
+			if cursor == "end" or (limit and limit > 0 and int(cursor) >= limit):
+				print(f"Projects for {username} are already complete in {export_path}")
+				checkpoint.close(complete=True)
+				return
+			offset = int(cursor)
+			if offset:
+				print(f"Resuming after {offset} project(s)")
+				limit = limit - offset if limit and limit > 0 else limit
+		elif resume:
+			print("--resume needs an NDJSON or CSV --export file")
+			return
+		try:
+			projs = backend.projects(username, limit=limit, offset=offset)
+			if getattr(args, "details", False):
+				projs = enrich_projects(projs, backend.project_detail, workers=args.detail_workers)
+			if store is not None:
+				projs = store.tee_projects(username, projs)
+			if images is not None:
+				projs = images.tee(projs, "thumbnail_url")
+			# honor requested format/export; every format streams and stops at --limit
+			if _write_stream(projs, fmt=getattr(args, "format", None), export_path=export_path,
+					envelope={"username": username, "projects": None},
+					fieldnames=PROJECT_DETAIL_FIELDS + ["detail_error"] if getattr(args, "details", False) else PROJECT_FIELDS,
+					checkpoint=checkpoint, key=username, start=offset) is False:
 				# fallback to human output
-				if projs:
-					print(f"Projects for {username}:")
-					n = 0
-					for p in projs:
-						n += 1
-						title = None
-						try:
-							title = getattr(p, "title", None) or getattr(p, "name", None) or getattr(p, "id", None) or str(p)
-						except Exception:
-							title = str(p)
-						print(f"- {title}")
-						if n >= limit:
-							break
-				else:
+				n = 0
+				for p in projs:
+					if not n:
+						print(f"Projects for {username}:")
+					n += 1
+					title = p.get("title") or p.get("id") or str(p)
+					print(f"- {title}")
+				if not n:
 					print("No project listing available for this user.")
+		except KeyboardInterrupt:
+			if checkpoint is None:
+				raise
+			print("Interrupted; continue with --resume.", file=sys.stderr)
 		except Exception as e:
-			print("Error listing projects:", e)
+			print("Error listing projects:", describe_error(e))
+		finally:
+			if checkpoint is not None:
+				# _write_stream logs the "end" cursor only after the last record
+				checkpoint.close(complete=checkpoint.cursor(username) == "end")
+			if store is not None:
+				store.close()
+			finish_images()
 		return
 
 	# Handle `messages` subcommand: requires authentication to show private message info
 	if getattr(args, "command", None) == "messages":
 		if not username:
 			username = input("Scratch username to show messages for: ").strip()
-		if session is None:
+		if session is None and isinstance(backend, LocalBackend):
 			print("Messages require an authenticated session. Provide --session-string, --login-username/--login-password, or --browser-login.")
 			return
+		# Only messages newer than the saved cursor are fetched, unless --all
+		cursor = read_message_cursor(username)
+		show_all = getattr(args, "all", False)
+		since = None if show_all else cursor["since"]
+		before = None if show_all else cursor["before"]
+		limit = getattr(args, "limit", 20)
+		seen = {"n": 0, "newest": None, "oldest": None}
+
+		def track(msgs):
+			for m in msgs:
+				mid = message_id(m)
+				if before is not None and (mid is None or mid >= before):
+					continue
+				if store is not None:
+					store.add_message(username, m)
+				seen["n"] += 1
+				if mid is not None:
+					seen["newest"] = mid if seen["newest"] is None else max(seen["newest"], mid)
+					seen["oldest"] = mid if seen["oldest"] is None else min(seen["oldest"], mid)
+				yield m
+				if before is not None and limit and limit > 0 and seen["n"] >= limit:
+					return
+
 		try:
-			user_obj = session.connect_user(username)
-			ok = user_obj.update()
-			if not ok:
-				raise RuntimeError(f"Failed to fetch data for user '{username}': {ok}")
-			# Try to show message count and list if available
-			msg_count = None
-			msgs = None
-			try:
-				msg_count = user_obj.message_count()
-			except Exception:
-				msg_count = None
-			try:
-				if hasattr(user_obj, "messages"):
-					msgs = user_obj.messages()
-				elif hasattr(user_obj, "get_messages"):
-					msgs = user_obj.get_messages()
-			except Exception:
-				msgs = None
-
-			out_obj = {"username": username, "message_count": msg_count, "messages": msgs}
-			if _write_output(out_obj, fmt=getattr(args, "format", None), export_path=getattr(args, "export", None)) is False:
-				print(f"Message count: {msg_count}")
-				if msgs:
-					print("Messages (first 20):")
-					for i, m in enumerate(msgs):
-						if i >= 20:
-							break
-						try:
-							print(f"- {getattr(m, 'subject', str(m))}")
-						except Exception:
-							print(f"- {m}")
+			# Resuming a gap pages past the messages already shown, so --limit is applied here
+			msgs = track(backend.messages(username, since=since, limit=None if before is not None else limit))
+			if _write_stream(msgs, fmt=getattr(args, "format", None), export_path=getattr(args, "export", None),
+					envelope={"username": username, "messages": None}) is False:
+				n = 0
+				for n, m in enumerate(msgs, 1):
+					if n == 1:
+						print("New messages:" if since is not None or before is not None else "Messages:")
+					print(f"- {message_summary(m)}")
+				if not n:
+					print("No new messages." if since is not None or before is not None else "No messages.")
+			# Move the cursor only once the messages were written out, and only past
+			# messages that were actually shown
+			truncated = bool(limit and limit > 0 and seen["n"] >= limit)
+			newest = cursor["newest"] if before is not None else seen["newest"]
+			if truncated and seen["oldest"] is not None:
+				if not show_all:
+					save_message_cursor(username, since, before=seen["oldest"], newest=newest)
+					print(f"Stopped at --limit {limit}; older unseen messages are shown on the next run.", file=sys.stderr)
+			elif newest is not None:
+				save_message_cursor(username, newest)
 		except Exception as e:
-			print("Error fetching messages:", e)
+			print("Error fetching messages:", describe_error(e))
+		finally:
+			if store is not None:
+				store.close()
 		return
 
 	try:
-		# If we have a session, connect the requested user through it to allow authenticated methods
+		# With a session (here or in the daemon) the view includes authenticated-only data
+		data = backend.user(username, with_messages=True)
+		if store is not None:
+			store.add_user(data)
+		if images is not None:
+			images.submit(data.get("icon_url"))
 		if session is not None:
-			user_obj = session.connect_user(username)
-			ok = user_obj.update()
-			if not ok:
-				raise RuntimeError(f"Failed to fetch data for user '{username}': {ok}")
-			data = {
-				**fetch_user_data(username),
-				"authenticated_view": True,
-				"message_count": None,
-			}
-			# Try some authenticated-only data (message count) if available
-			try:
-				data["message_count"] = user_obj.message_count()
-			except Exception:
-				data["message_count"] = None
 			# Save session info for future runs
 			try:
-				saved_ok = save_session_info(session)
+				saved_ok = save_session_info(session, validated_at=validated_at)
 				if saved_ok:
-					print("Saved session info to ~/.scratchattach_session")
+					print(f"Saved session info to {SESSION_FILE}")
 				# If environment requests keyring usage, try saving session_string there too
 				try:
-					if HAVE_KEYRING and os.environ.get("SCRATCH_USE_KEYRING") == "1":
+					if have_keyring() and os.environ.get("SCRATCH_USE_KEYRING") == "1":
 						ss = getattr(session, "session_string", None)
 						if ss:
 							saved_k = save_session_keyring(ss)
@@ -487,15 +3710,14 @@ def main():
 					pass
 			except Exception:
 				pass
-		else:
-			data = fetch_user_data(username)
 
 		# Output: either raw JSON or pretty human-readable (with optional rich colors)
 		# Try serialization helper first
 		if _write_output(data, fmt=getattr(args, "format", None), export_path=getattr(args, "export", None)) is False:
 			# helper chose not to serialize; fall back to pretty printing
-			if HAVE_RICH:
-				c = _console
+			if have_rich():
+				from rich.panel import Panel
+				c = optional_import("rich.console").Console()
 				c.rule("Scratch user info")
 				c.print(Panel.fit(f"[bold cyan]{data.get('username')}[/bold cyan]  (id: {data.get('id')})", title="User"))
 				if data.get('about_me'):
@@ -533,7 +3755,11 @@ def main():
 				if data.get("authenticated_view"):
 					p("Message count", data.get("message_count"))
 	except Exception as e:
-		print("Error:", e)
+		print("Error:", describe_error(e))
+	finally:
+		if store is not None:
+			store.close()
+		finish_images()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,14 @@
+import importlib.util
+import os
+
+import pytest
+
+
+@pytest.fixture
+def main_module():
+    # Import main.py by path (same approach as test_import.py)
+    path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'main.py'))
+    spec = importlib.util.spec_from_file_location('main_test', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import zipfile
+
+SB3 = {
+    'targets': [
+        {'isStage': True, 'variables': {'v1': ['score', 0]}, 'lists': {}, 'comments': {},
+         'blocks': {}, 'costumes': [{'md5ext': 'bg.svg'}], 'sounds': [{'md5ext': 'pop.wav', 'sampleCount': 22050, 'rate': 44100}]},
+        {'isStage': False, 'variables': {}, 'lists': {'l1': ['items', []]}, 'comments': {'c1': {}},
+         'blocks': {
+             'a': {'opcode': 'event_whenflagclicked', 'topLevel': True},
+             'b': {'opcode': 'motion_movesteps', 'topLevel': False},
+             'c': {'opcode': 'math_number', 'shadow': True},
+             'd': {'opcode': 'pen_penDown', 'topLevel': False},
+             'r': [12, 'score', 'v1', 10, 10],
+         },
+         'costumes': [{'md5ext': 'cat.svg'}, {'md5ext': 'bg.svg'}], 'sounds': []},
+    ],
+    'extensions': ['pen'],
+}
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def check_sb3(metrics):
+    assert metrics['format'] == 'sb3'
+    assert (metrics['sprites'], metrics['blocks'], metrics['scripts'], metrics['unique_opcodes']) == (1, 3, 1, 3)
+    assert (metrics['costumes'], metrics['sounds'], metrics['unique_assets']) == (3, 1, 3)
+    assert metrics['sound_seconds'] == 0.5
+    assert (metrics['variables'], metrics['lists'], metrics['comments']) == (1, 1, 1)
+    assert metrics['extensions'] == ['pen']
+
+
+def test_analyze_project_file_streams_and_falls_back(main_module, tmp_path, monkeypatch):
+    path = write(tmp_path, 'p.json', SB3)
+    metrics = main_module.analyze_project_file(path)
+    check_sb3(metrics)
+    assert metrics['json_bytes'] == os.path.getsize(path)
+    # Without ijson the whole file is parsed at once, with the same result
+    monkeypatch.setitem(main_module._optional_modules, 'ijson', None)
+    check_sb3(main_module.analyze_project_file(path))
+
+
+def test_analyze_project_file_handles_archives_and_sb2(main_module, tmp_path):
+    archive = str(tmp_path / 'p.sb3')
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('project.json', json.dumps(SB3))
+    check_sb3(main_module.analyze_project_file(archive))
+
+    sb2 = {'objName': 'Stage', 'scripts': [[0, 0, []]], 'costumes': [{'baseLayerMD5': 'a.png'}],
+           'children': [{'objName': 'Sprite1', 'scripts': [[0, 0, []], [1, 1, []]], 'costumes': [{'baseLayerMD5': 'a.png'}]},
+                        {'target': 'Sprite1', 'cmd': 'getVar:'}]}
+    metrics = main_module.analyze_project_file(write(tmp_path, 'old.json', sb2))
+    assert (metrics['format'], metrics['sprites'], metrics['scripts'], metrics['blocks'], metrics['unique_assets']) == ('sb2', 1, 3, None, 1)
+
+
+def test_analyze_projects_uses_worker_processes(main_module, tmp_path, monkeypatch):
+    # Worker processes look the analysis function up by module name
+    monkeypatch.setitem(sys.modules, main_module.__name__, main_module)
+
+    def download(project, dest_dir):
+        if project['id'] == 3:
+            raise RuntimeError('project not shared')
+        return write(tmp_path, f"{project['id']}.json", SB3)
+
+    results = list(main_module.analyze_projects(({'id': i} for i in range(4)), download, workers=2, processes=2))
+    assert sorted(p['id'] for p, m, e in results if e is None) == [0, 1, 2]
+    assert [str(e) for p, m, e in results if e is not None] == ['project not shared']
+    for _, metrics, err in results:
+        if err is None:
+            check_sb3(metrics)
+    # Analyzed files are cleaned up
+    assert not list(tmp_path.glob('*.json'))
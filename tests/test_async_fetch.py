@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+
+def test_async_users_streams_results_and_errors(main_module):
+    def fake_fetch(name):
+        time.sleep(0.05 if name == 'slow' else 0)
+        if name == 'bad':
+            raise RuntimeError('boom')
+        return {'username': name}
+
+    async def collect(ordered):
+        fetcher = main_module.AsyncFetcher(concurrency=4, fetch=fake_fetch)
+        try:
+            return [r async for r in fetcher.users(['slow', 'bad', 'c'], ordered=ordered)]
+        finally:
+            fetcher.close()
+
+    streamed = asyncio.run(collect(False))
+    assert streamed[-1][0] == 'slow'
+    assert [str(err) for _, _, err in streamed if err] == ['boom']
+    assert [name for name, _, _ in asyncio.run(collect(True))] == ['slow', 'bad', 'c']
+
+
+def test_async_fetcher_bounds_in_flight_calls(main_module):
+    state = {'active': 0, 'peak': 0}
+
+    def fake_fetch(name):
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.01)
+        state['active'] -= 1
+        return {'username': name}
+
+    async def run():
+        fetcher = main_module.AsyncFetcher(concurrency=3, fetch=fake_fetch)
+        try:
+            return [r async for r in fetcher.users(str(i) for i in range(20))]
+        finally:
+            fetcher.close()
+
+    assert len(asyncio.run(run())) == 20
+    assert state['peak'] <= 3
+
+
+def test_async_projects_and_messages_use_the_backend(main_module):
+    class FakeBackend:
+        def projects(self, username, limit=20):
+            return iter({'id': i, 'owner': username} for i in range(limit))
+
+        def messages(self, username, since=None, limit=None):
+            return iter([{'to': username}])
+
+    async def run():
+        fetcher = main_module.AsyncFetcher(concurrency=2, backend=FakeBackend())
+        try:
+            return await fetcher.projects('alice', limit=3), await fetcher.messages('bob')
+        finally:
+            fetcher.close()
+
+    projects, messages = asyncio.run(run())
+    assert projects == [{'id': i, 'owner': 'alice'} for i in range(3)]
+    assert messages == [{'to': 'bob'}]
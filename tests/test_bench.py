@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+BENCH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench.py'))
+
+
+def test_benchmarks_run_offline_and_flag_regressions(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    proc = subprocess.run(
+        [sys.executable, BENCH, '--quick', '--latency-ms', '1', '--error-rate', '0.2',
+         '--scenario', 'fetch', '--scenario', 'write-ndjson', '--save', str(baseline)],
+        capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    results = json.loads(baseline.read_text())['results']
+    assert set(results) == {'fetch', 'write-ndjson'}
+    assert results['fetch']['ops'] == 10 and results['fetch']['p99_ms'] >= results['fetch']['p50_ms']
+
+    # A baseline far faster than anything achievable must be reported as a regression
+    for r in results.values():
+        r['throughput'] *= 1000
+    baseline.write_text(json.dumps({'results': results}))
+    proc = subprocess.run(
+        [sys.executable, BENCH, '--quick', '--latency-ms', '1', '--scenario', 'fetch', '--compare', str(baseline)],
+        capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 1
+    assert 'REGRESSION: fetch' in proc.stderr
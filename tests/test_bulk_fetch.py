@@ -0,0 +1,45 @@
+import time
+
+
+def test_read_usernames_merges_args_and_file(main_module, tmp_path):
+    names_file = tmp_path / 'names.txt'
+    names_file.write_text('griffpatch\n\n# comment\nalice\nbob\n')
+    names = list(main_module.read_usernames(['alice', 'carol'], str(names_file)))
+    assert names == ['alice', 'carol', 'griffpatch', 'bob']
+
+
+def test_fetch_users_bulk_reports_errors_inline(main_module):
+    def fake_fetch(name):
+        if name == 'bad':
+            raise RuntimeError('boom')
+        return {'username': name}
+
+    results = list(main_module.fetch_users_bulk(['a', 'bad', 'c'], workers=2, fetch=fake_fetch))
+    assert len(results) == 3
+    errors = {name: err for name, _, err in results if err is not None}
+    assert list(errors) == ['bad']
+    assert str(errors['bad']) == 'boom'
+
+
+def test_fetch_users_bulk_ordered_keeps_input_order(main_module):
+    def slow_first(name):
+        time.sleep(0.05 if name == 'a' else 0)
+        return {'username': name}
+
+    names = ['a', 'b', 'c', 'd']
+    ordered = [name for name, _, _ in main_module.fetch_users_bulk(names, workers=4, ordered=True, fetch=slow_first)]
+    assert ordered == names
+    streamed = [name for name, _, _ in main_module.fetch_users_bulk(names, workers=4, fetch=slow_first)]
+    assert streamed[-1] == 'a'
+
+
+def test_bulk_fetch_reports_missing_file(main_module, monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    main_module.main(['--no-daemon', '--no-cache', 'fetch', '--file', str(tmp_path / 'missing.txt')])
+    assert 'Cannot read usernames from' in capsys.readouterr().out
+
+
+def test_bounded_map_passes_any_item(main_module):
+    results = list(main_module.bounded_map(lambda n: 10 // n, [5, 0, None, 2], workers=2, ordered=True))
+    assert [(item, data) for item, data, _ in results] == [(5, 2), (0, None), (None, None), (2, 5)]
+    assert isinstance(results[1][2], ZeroDivisionError) and isinstance(results[2][2], TypeError)
@@ -0,0 +1,55 @@
+def test_cache_roundtrip_and_ttl(main_module, tmp_path):
+    cache = main_module.ResponseCache(path=str(tmp_path / 'cache.sqlite'), ttls={'user': 60, 'projects': 0})
+    cache.set('user', 'griffpatch', {'username': 'griffpatch'})
+    cache.set('projects', 'griffpatch', [{'id': 1}])
+    assert cache.get('user', 'griffpatch') == {'username': 'griffpatch'}
+    # A zero TTL means the entry is already stale
+    assert cache.get('projects', 'griffpatch') is None
+    assert cache.get('user', 'nobody') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_get_or_fetch_and_refresh(main_module, tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {'n': len(calls)}
+
+    cache = main_module.ResponseCache(path=path)
+    assert cache.get_or_fetch('user', 'a', fetch) == {'n': 1}
+    assert cache.get_or_fetch('user', 'a', fetch) == {'n': 1}
+    cache.close()
+
+    # --refresh skips reads but stores the new value for later runs
+    refreshing = main_module.ResponseCache(path=path, refresh=True)
+    assert refreshing.get_or_fetch('user', 'a', fetch) == {'n': 2}
+    refreshing.close()
+    assert main_module.ResponseCache(path=path).get('user', 'a') == {'n': 2}
+
+
+def test_cache_evicts_least_recently_used(main_module, tmp_path):
+    cache = main_module.ResponseCache(path=str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cache.set('user', 'a', 1)
+    cache.set('user', 'b', 2)
+    cache.get('user', 'a')
+    cache.set('user', 'c', 3)
+    cache.close()
+    cache = main_module.ResponseCache(path=str(tmp_path / 'cache.sqlite'), max_entries=2)
+    assert cache.get('user', 'a') == 1
+    assert cache.get('user', 'b') is None
+    assert cache.get('user', 'c') == 3
+
+
+def test_tiered_cache_promotes_from_back(main_module, tmp_path):
+    back = main_module.ResponseCache(path=str(tmp_path / 'cache.sqlite'))
+    back.set('user', 'a', {'n': 1})
+    front = main_module.MemoryCache(max_entries=1)
+    tiered = main_module.TieredCache(front, back)
+    assert tiered.get('user', 'a') == {'n': 1}
+    assert front.get('user', 'a') == {'n': 1}
+    tiered.set('user', 'b', {'n': 2})
+    assert front.get('user', 'a') is None
+    assert back.get('user', 'b') == {'n': 2}
+    back.close()
@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = 0
+
+    def do_GET(self):
+        Handler.hits += 1
+        body = ('{"n": %d}' % Handler.hits).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_record_then_replay_offline(main_module, tmp_path):
+    from scratchattach.utils.requests import requests as sa_requests
+    assert main_module.install_http_hooks()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    path = str(tmp_path / 'run.cassette')
+    try:
+        main_module.use_cassette(record=path)
+        assert sa_requests.get(f'{base}/users/a?cachebust=1').json() == {'n': 1}
+        assert sa_requests.get(f'{base}/users/a?cachebust=2').json() == {'n': 2}
+        assert sa_requests.get(f'{base}/users/b').json() == {'n': 3}
+        main_module.CASSETTE.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # A torn entry from an interrupted recording is ignored
+    with open(path, 'ab') as f:
+        f.write(b'\x00\x00\x00\x10\x00')
+    try:
+        cassette = main_module.use_cassette(replay=path)
+        assert len(cassette) == 3
+        # Repeated requests replay in recorded order, then the last answer repeats
+        assert [sa_requests.get(f'{base}/users/a?cachebust=9').json()['n'] for _ in range(3)] == [1, 2, 2]
+        resp = sa_requests.get(f'{base}/users/b')
+        assert resp.json() == {'n': 3} and resp.headers['Content-Type'] == 'application/json'
+        try:
+            sa_requests.get(f'{base}/users/missing')
+        except Exception as e:
+            assert 'not in cassette' in str(e)
+        else:
+            raise AssertionError('unrecorded request was answered')
+    finally:
+        main_module.CASSETTE = None
+
+
+def test_cassette_runs_bypass_response_cache(main_module, monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    caches = []
+
+    def fake_user(self, username, with_messages=False):
+        caches.append(self.cache)
+        if self.cache is not None:
+            hit = self.cache.get('user', username.lower())
+            if hit is not None:
+                return hit
+        # Stands in for the live lookup that the recording hook would capture
+        data = {'username': username, 'id': 1}
+        if self.cache is not None:
+            self.cache.set('user', username.lower(), data)
+        return data
+
+    monkeypatch.setattr(main_module.LocalBackend, 'user', fake_user)
+    args = ['--no-daemon', '--json', 'fetch', 'alice']
+    main_module.main(args)
+    assert caches[-1] is not None  # warm cache
+    try:
+        main_module.main(['--record', str(tmp_path / 'run.cassette')] + args)
+        assert caches[-1] is None
+        main_module.main(['--replay', str(tmp_path / 'run.cassette')] + args)
+        assert caches[-1] is None
+    finally:
+        main_module.CASSETTE = None
@@ -0,0 +1,76 @@
+import json
+import os
+
+
+def test_checkpoint_resume_truncates_uncommitted_output(main_module, tmp_path):
+    export = str(tmp_path / 'users.ndjson')
+    log = export + '.checkpoint'
+    checkpoint = main_module.Checkpoint(log, export)
+    writer = main_module.open_writer('ndjson', export)
+    for name in ('alice', 'Bob'):
+        writer.write({'username': name})
+        checkpoint.commit(name, writer)
+    # Crash after a record was written but before it was logged, mid-way through a log line
+    writer.write({'username': 'carol'})
+    writer.close()
+    with open(log, 'a') as f:
+        f.write('carol\t')
+    checkpoint.close()
+
+    checkpoint = main_module.Checkpoint(log, export, resume=True)
+    assert checkpoint.done == {'alice': '', 'bob': ''}
+    assert checkpoint.cursor('BOB') == ''
+    assert checkpoint.cursor('carol') is None
+    writer = main_module.open_writer('ndjson', export, mode='a')
+    writer.write({'username': 'carol'})
+    checkpoint.commit('carol', writer)
+    writer.close()
+    checkpoint.close()
+    with open(export) as f:
+        assert [json.loads(line)['username'] for line in f] == ['alice', 'Bob', 'carol']
+
+
+def test_checkpoint_resume_requires_log(main_module, tmp_path):
+    try:
+        main_module.Checkpoint(str(tmp_path / 'missing'), str(tmp_path / 'out.ndjson'), resume=True)
+    except RuntimeError as e:
+        assert 'nothing to resume' in str(e)
+    else:
+        raise AssertionError('resume without a checkpoint succeeded')
+
+
+def test_resumed_projects_export_continues_after_cursor(main_module, monkeypatch, tmp_path, capsys):
+    calls = []
+
+    def fake_projects(self, username, limit=20, offset=0):
+        calls.append((limit, offset))
+        for i in range(offset, offset + limit):
+            if len(calls) == 1 and i == 2:
+                raise KeyboardInterrupt
+            yield {'id': i}
+
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(main_module.LocalBackend, 'projects', fake_projects)
+    out = str(tmp_path / 'projects.ndjson')
+    main_module.main(['--no-daemon', '--no-cache', '--export', out, 'projects', 'alice', '--limit', '5'])
+    # The interrupted run keeps its log for --resume
+    with open(out + '.checkpoint') as f:
+        assert len(f.readlines()) == 2
+    main_module.main(['--no-daemon', '--no-cache', '--export', out, 'projects', 'alice', '--limit', '5', '--resume'])
+    assert calls == [(5, 0), (3, 2)]
+    with open(out) as f:
+        assert [json.loads(line)['id'] for line in f] == [0, 1, 2, 3, 4]
+    # A finished job leaves no log behind
+    assert not os.path.exists(out + '.checkpoint')
+    main_module.main(['--no-daemon', '--no-cache', '--export', out, 'projects', 'alice', '--limit', '5', '--resume'])
+    assert 'nothing to resume' in capsys.readouterr().out
+
+
+def test_completed_bulk_export_removes_checkpoint(main_module, monkeypatch, tmp_path):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(main_module.LocalBackend, 'user', lambda self, name, with_messages=False: {'username': name})
+    out = str(tmp_path / 'users.csv')
+    main_module.main(['--no-daemon', '--no-cache', '--export', out, 'fetch', 'alice', 'bob'])
+    with open(out) as f:
+        assert len(f.readlines()) == 3
+    assert not os.path.exists(out + '.checkpoint')
@@ -0,0 +1,63 @@
+import pytest
+
+# a follows b, c; b follows c; c follows d; d follows e
+FOLLOWS = {'a': ['b', 'c'], 'b': ['c'], 'c': ['d'], 'd': ['e'], 'e': []}
+
+
+def make_fetch(page_size=40, fail_on=None):
+    calls = []
+
+    def fetch_page(username, relation, offset):
+        calls.append((username, relation, offset))
+        if fail_on and (username, relation) == fail_on:
+            raise KeyboardInterrupt
+        if relation == 'following':
+            names = FOLLOWS[username]
+        else:
+            names = [u for u, out in FOLLOWS.items() if username in out]
+        return names[offset:offset + page_size]
+
+    return fetch_page, calls
+
+
+def test_crawl_walks_breadth_first_to_depth(main_module, tmp_path):
+    state = main_module.CrawlState(str(tmp_path / 'crawl.sqlite'))
+    edges = []
+    fetch_page, calls = make_fetch()
+    stats = main_module.crawl_graph(['a'], state, edges.append, depth=2, relations=('following',), workers=2, fetch_page=fetch_page)
+    assert {(e['source'], e['target']) for e in edges} == {('a', 'b'), ('a', 'c'), ('b', 'c'), ('c', 'd')}
+    # Users at the maximum depth are recorded but not expanded
+    assert sorted(u for u, _, _ in calls) == ['a', 'b', 'c']
+    assert state.counts() == {'visited': 4, 'pending': 0}
+    assert stats['edges'] == 4
+
+
+def test_crawl_resumes_from_checkpoint(main_module, tmp_path):
+    path = str(tmp_path / 'crawl.sqlite')
+    edges = []
+    fetch_page, _ = make_fetch(fail_on=('b', 'following'))
+    state = main_module.CrawlState(path)
+    with pytest.raises(KeyboardInterrupt):
+        main_module.crawl_graph(['a'], state, edges.append, depth=3, relations=('following',), workers=1, fetch_page=fetch_page)
+    state.close()
+
+    fetch_page, calls = make_fetch()
+    state = main_module.CrawlState(path)
+    main_module.crawl_graph([], state, edges.append, depth=3, relations=('following',), workers=1, fetch_page=fetch_page)
+    # 'a' was committed before the interruption and is not fetched again
+    assert ('a', 'following', 0) not in calls
+    assert {(e['source'], e['target']) for e in edges} == {('a', 'b'), ('a', 'c'), ('b', 'c'), ('c', 'd'), ('d', 'e')}
+
+
+def test_crawl_pages_through_large_relations(main_module, tmp_path):
+    state = main_module.CrawlState(str(tmp_path / 'crawl.sqlite'))
+    edges = []
+
+    def fetch_page(username, relation, offset):
+        if username != 'hub':
+            return []
+        return [f'u{i}' for i in range(offset, min(offset + 40, 95))]
+
+    main_module.crawl_graph(['hub'], state, edges.append, depth=1, relations=('followers',), fetch_page=fetch_page)
+    assert len(edges) == 95
+    assert edges[0] == {'source': 'u0', 'target': 'hub', 'depth': 1}
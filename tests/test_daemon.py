@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+
+class FakeBackend:
+    session = None
+
+    def user(self, username, with_messages=False):
+        if username == 'missing':
+            raise RuntimeError('User not found')
+        return {'username': username, 'authenticated_view': with_messages}
+
+    def projects(self, username, limit=20, offset=0):
+        for i in range(offset, offset + limit):
+            yield {'id': i, 'title': f'{username} {i}'}
+
+    def messages(self, username, since=None, limit=None):
+        raise RuntimeError('Messages require an authenticated session')
+
+
+@pytest.fixture
+def daemon(main_module, tmp_path):
+    path = tmp_path / 'daemon.json'
+    thread = threading.Thread(
+        target=main_module.serve, args=(FakeBackend(),),
+        kwargs={'port': 0, 'daemon_file': str(path)}, daemon=True,
+    )
+    thread.start()
+    for _ in range(100):
+        if path.exists() and path.stat().st_size:
+            break
+        time.sleep(0.02)
+    client = main_module.DaemonClient.discover(str(path))
+    assert client is not None
+    return client, path
+
+
+def test_daemon_answers_queries(daemon):
+    client, _ = daemon
+    assert client.user('alice', with_messages=True) == {'username': 'alice', 'authenticated_view': True}
+    assert [p['id'] for p in client.projects('alice', limit=3)] == [0, 1, 2]
+    with pytest.raises(RuntimeError, match='authenticated session'):
+        list(client.messages('alice'))
+    with pytest.raises(RuntimeError, match='not found'):
+        client.user('missing')
+
+
+def test_daemon_rejects_bad_token(main_module, daemon):
+    client, path = daemon
+    assert oct(os.stat(path).st_mode & 0o777) == oct(0o600)
+    with pytest.raises(RuntimeError, match='token'):
+        main_module.DaemonClient(client.url, 'wrong').user('alice')
+
+
+def test_discover_ignores_stale_file(main_module, tmp_path):
+    path = tmp_path / 'daemon.json'
+    path.write_text(json.dumps({'host': '127.0.0.1', 'port': 9, 'pid': os.getpid(), 'token': 'x'}))
+    assert main_module.DaemonClient.discover(str(path)) is None
+    assert main_module.DaemonClient.discover(str(tmp_path / 'absent.json')) is None
@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def gui_module():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    spec = importlib.util.spec_from_file_location('gui_test', os.path.join(root, 'gui.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_pool_coalesces_supersedes_and_caches(gui_module):
+    calls = []
+    release = threading.Event()
+
+    def fake_fetch(name):
+        calls.append(name)
+        release.wait(2)
+        return {'username': name}
+
+    pool = gui_module.FetchPool(fetch=fake_fetch, workers=1)
+    shown = []
+    deliver = lambda data, err: shown.append((data, err))
+    pool.request('alice', deliver)
+    pool.request('Alice', deliver)   # coalesced with the running lookup
+    pool.request('bob', deliver)     # queued behind alice...
+    pool.request('carol', deliver)   # ...and cancelled once carol supersedes it
+    release.set()
+    deadline = time.time() + 2
+    while len(calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert calls == ['alice', 'carol']
+    assert shown == [({'username': 'carol'}, None)]
+
+    # Recent results are answered from the LRU without another fetch
+    pool.request('ALICE', deliver)
+    assert shown[-1] == ({'username': 'alice'}, None)
+    assert calls == ['alice', 'carol']
+    pool.close()
@@ -0,0 +1,33 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_shared_pool_reuses_connections(main_module):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        adapter = main_module.configure_http_pool(pool_size=4, compress=False)
+        assert adapter is not None
+        from scratchattach.utils.requests import requests as sa_requests
+        assert sa_requests.headers['Accept-Encoding'] == 'identity'
+        for _ in range(5):
+            assert sa_requests.get(f'http://127.0.0.1:{server.server_port}/users/x').status_code == 200
+        stats = main_module.connection_stats()
+        assert stats['hosts']['127.0.0.1'] == {'requests': 5, 'connections': 1}
+        assert stats['reused'] == 4
+    finally:
+        server.shutdown()
+        main_module.configure_http_pool(pool_size=16, compress=True)
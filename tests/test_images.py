@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+def make_server(images):
+    calls = []
+
+    def get(url, headers=None, **kwargs):
+        calls.append((url, dict(headers or {})))
+        body = images[url]
+        etag = '"%d"' % len(body)
+        if (headers or {}).get('If-None-Match') == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, body, {'ETag': etag, 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+
+    return get, calls
+
+
+def test_image_store_deduplicates_and_revalidates(main_module, tmp_path):
+    images = {
+        'https://cdn/a.png': b'x' * 200000,
+        'https://cdn/b.png': b'x' * 200000,  # same bytes, different URL
+    }
+    get, calls = make_server(images)
+    store = main_module.ImageStore(str(tmp_path), get=get)
+    first = store.fetch('https://cdn/a.png')
+    assert first['status'] == 'downloaded'
+    assert open(first['path'], 'rb').read() == images['https://cdn/a.png']
+    second = store.fetch('https://cdn/b.png')
+    assert second['status'] == 'deduplicated' and second['path'] == first['path']
+    # A repeat download is conditional and answered with 304
+    again = store.fetch('https://cdn/a.png')
+    assert again == {'url': 'https://cdn/a.png', 'path': first['path'], 'status': 'not-modified'}
+    assert calls[-1][1]['If-None-Match'] == '"200000"'
+    assert calls[-1][1]['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+    store.close()
+    blobs = [f for _, _, files in os.walk(tmp_path) for f in files if f.endswith('.png')]
+    assert len(blobs) == 1
+
+
+def test_image_downloader_fetches_each_url_once(main_module, tmp_path):
+    images = {f'https://cdn/{i}.png': bytes([i]) * 10 for i in range(20)}
+    images['https://cdn/missing.png'] = None
+    get, calls = make_server(images)
+
+    def flaky_get(url, **kwargs):
+        if images[url] is None:
+            return FakeResponse(404)
+        return get(url, **kwargs)
+
+    downloader = main_module.ImageDownloader(main_module.ImageStore(str(tmp_path), get=flaky_get), workers=4)
+    records = [{'thumbnail_url': url} for url in list(images) * 2] + [{'thumbnail_url': None}]
+    assert list(downloader.tee(records, 'thumbnail_url')) == records
+    stats = downloader.close()
+    assert stats == {'downloaded': 20, 'deduplicated': 0, 'not-modified': 0, 'failed': 1}
+    assert len(calls) == 20
+
+
+def test_image_store_removes_partial_download(main_module, tmp_path):
+    class Broken(FakeResponse):
+        def iter_content(self, chunk_size):
+            yield b'partial'
+            raise ConnectionError('reset')
+
+    store = main_module.ImageStore(str(tmp_path), get=lambda url, **kw: Broken(200))
+    with pytest.raises(ConnectionError):
+        store.fetch('https://cdn/a.png')
+    store.close()
+    assert sorted(os.listdir(tmp_path)) == ['index.sqlite']
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+
+def make_inbox(total, newest_id=1000):
+    calls = []
+
+    def fetch_page(offset):
+        calls.append(offset)
+        return [{'id': newest_id - i, 'type': 'loveproject'} for i in range(offset, min(offset + 40, total))]
+
+    return fetch_page, calls
+
+
+def test_iter_messages_stops_at_cursor_and_limit(main_module):
+    fetch_page, calls = make_inbox(200)
+    msgs = list(main_module.iter_messages(fetch_page, since=1000 - 45))
+    assert [m['id'] for m in msgs] == list(range(1000, 1000 - 45, -1))
+    assert calls == [0, 40]
+
+    fetch_page, calls = make_inbox(200)
+    assert len(list(main_module.iter_messages(fetch_page, limit=40))) == 40
+    assert calls == [0]
+
+
+def test_message_cursor_only_moves_forward(main_module, tmp_path):
+    path = str(tmp_path / 'cursors.json')
+    assert main_module.read_message_cursor('Alice', path) == {'since': None, 'before': None, 'newest': None}
+    main_module.save_message_cursor('Alice', 10, path)
+    main_module.save_message_cursor('alice', 7, path)
+    assert main_module.read_message_cursor('ALICE', path)['since'] == 10
+    main_module.save_message_cursor('alice', 10, path, before=15, newest=20)
+    assert main_module.read_message_cursor('alice', path) == {'since': 10, 'before': 15, 'newest': 20}
+
+
+def run_messages(main_module, capsys, args):
+    main_module.main(args)
+    captured = capsys.readouterr()
+    return [json.loads(line)['id'] for line in captured.out.splitlines() if line.startswith('{')], captured.err
+
+
+@pytest.fixture
+def inbox(main_module, monkeypatch, tmp_path):
+    class FakeSession:
+        username = 'alice'
+
+        def __init__(self):
+            self.newest = 100
+            self.oldest = 41
+
+        def messages(self, limit=40, offset=0):
+            ids = range(self.newest - offset, max(self.newest - offset - limit, self.oldest - 1), -1)
+            return [{'id': i, 'type': 'followuser'} for i in ids]
+
+    session = FakeSession()
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(main_module.scratchattach, 'login_by_session_string', lambda s: session, raising=False)
+    monkeypatch.setattr(main_module, 'ensure_fresh_session', lambda ses: None)
+    return session, ['--no-daemon', '--no-cache', '--session-string', 'x', '--format', 'ndjson', 'messages', 'alice']
+
+
+def test_messages_command_streams_only_new_messages(main_module, inbox, capsys):
+    session, args = inbox
+    assert run_messages(main_module, capsys, args + ['--limit', '0'])[0] == list(range(100, 40, -1))
+
+    session.newest = 103
+    assert run_messages(main_module, capsys, args + ['--limit', '0'])[0] == [103, 102, 101]
+    assert run_messages(main_module, capsys, args + ['--limit', '0'])[0] == []
+
+
+def test_messages_cut_off_by_limit_are_shown_later(main_module, inbox, capsys):
+    session, args = inbox
+    session.newest, session.oldest = 150, 101
+    first, err = run_messages(main_module, capsys, args + ['--limit', '20'])
+    assert first == list(range(150, 130, -1))
+    assert '--limit' in err
+    # New messages arriving meanwhile wait until the gap is shown
+    session.newest = 152
+    assert run_messages(main_module, capsys, args + ['--limit', '20'])[0] == list(range(130, 110, -1))
+    assert run_messages(main_module, capsys, args + ['--limit', '20'])[0] == list(range(110, 100, -1))
+    assert run_messages(main_module, capsys, args + ['--limit', '20'])[0] == [152, 151]
+    assert run_messages(main_module, capsys, args + ['--limit', '20'])[0] == []
@@ -0,0 +1,77 @@
+import threading
+
+
+def test_select_profiles_skips_config_sections(main_module):
+    config = {'default': {'username': 'a'}, 'work': {'username': 'b'}, 'cache': {'ttl_user': 5}, 'stray': 1}
+    assert list(main_module.select_profiles(config, 'all')) == ['default', 'work']
+    assert list(main_module.select_profiles(config, 'work, default')) == ['work', 'default']
+    try:
+        main_module.select_profiles(config, 'nope')
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('unknown profile accepted')
+
+
+def test_run_profiles_tags_records_and_isolates_limiters(main_module, monkeypatch):
+    limiters = {}
+    lock = threading.Lock()
+
+    def fake_user(self, username, with_messages=False):
+        with lock:
+            limiters[username] = main_module.PROFILE_LIMITER.get(None)
+        if username == 'broken':
+            raise RuntimeError('boom')
+        return {'username': username, 'session': getattr(self.session, 'name', None)}
+
+    class FakeSession:
+        def __init__(self, name):
+            self.name = name
+
+    monkeypatch.setattr(main_module.LocalBackend, 'user', fake_user)
+    profiles = {
+        'a': {'username': 'alice', 'session_string': 'x'},
+        'b': {'username': 'bob', 'rate': 2, 'burst': 3},
+        'c': {'username': 'broken'},
+    }
+    records = []
+    failed = main_module.run_profiles(
+        profiles, 'fetch', records.append, rate=5, burst=7,
+        login=lambda prof: FakeSession(prof['username']) if prof.get('session_string') else None,
+    )
+    assert failed == 1
+    by_profile = {r['profile']: r for r in records}
+    assert by_profile['a'] == {'profile': 'a', 'username': 'alice', 'session': 'alice'}
+    assert by_profile['b']['session'] is None
+    assert by_profile['c'] == {'profile': 'c', 'error': 'boom'}
+    # Every profile spends its own token bucket, configured per profile
+    assert len({id(v) for v in limiters.values()}) == 3
+    assert (limiters['alice'].rate, limiters['alice'].burst) == (5, 7)
+    assert (limiters['bob'].rate, limiters['bob'].burst) == (2, 3)
+    assert main_module.PROFILE_LIMITER.get(None) is None
+
+
+def test_run_profiles_stops_workers_when_emit_fails(main_module, monkeypatch):
+    def many_projects(self, username, limit=20, offset=0):
+        for i in range(10000):
+            yield {'id': i}
+
+    def emit(record):
+        raise BrokenPipeError()
+
+    monkeypatch.setattr(main_module.LocalBackend, 'projects', many_projects)
+    profiles = {name: {'username': name} for name in ('a', 'b', 'c')}
+    result = []
+    thread = threading.Thread(target=lambda: result.append(
+        _raises(lambda: main_module.run_profiles(profiles, 'projects', emit, login=lambda prof: None))))
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), 'run_profiles hung after emit raised'
+    assert result == [BrokenPipeError]
+
+
+def _raises(fn):
+    try:
+        fn()
+    except Exception as e:
+        return type(e)
@@ -0,0 +1,40 @@
+import threading
+import time
+
+
+def test_enrich_projects_merges_details_in_order(main_module):
+    state = {'active': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def fetch_detail(pid):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.01 * (pid % 3))
+        with lock:
+            state['active'] -= 1
+        if pid == 4:
+            raise RuntimeError('project not available')
+        return {'id': pid, 'views': pid * 100, 'notes': f'notes {pid}', 'title': None}
+
+    projects = [{'id': i, 'title': f'p{i}', 'views': 1} for i in range(12)]
+    out = list(main_module.enrich_projects(iter(projects), fetch_detail, workers=3))
+    assert [p['id'] for p in out] == list(range(12))
+    assert out[1] == {'id': 1, 'title': 'p1', 'views': 100, 'notes': 'notes 1'}
+    assert out[4]['detail_error'] == 'project not available' and out[4]['views'] == 1
+    assert state['peak'] <= 3
+
+
+def test_project_detail_reuses_fresh_cache(main_module, monkeypatch):
+    calls = []
+
+    def fake_detail(pid, session=None):
+        calls.append(pid)
+        return {'id': int(pid), 'loves': 5}
+
+    monkeypatch.setattr(main_module, 'fetch_project_detail', fake_detail)
+    backend = main_module.LocalBackend(cache=main_module.MemoryCache())
+    records = [{'id': 1}, {'id': 2}, {'id': 1}]
+    assert [p['loves'] for p in main_module.enrich_projects(records, backend.project_detail, workers=1)] == [5, 5, 5]
+    assert list(main_module.enrich_projects([{'id': 2}], backend.project_detail)) == [{'id': 2, 'loves': 5}]
+    assert calls == [1, 2]
@@ -0,0 +1,41 @@
+def make_pages(total, page_size=40):
+    calls = []
+
+    def fetch_page(offset):
+        calls.append(offset)
+        return [{'id': i} for i in range(offset, min(offset + page_size, total))]
+
+    return fetch_page, calls
+
+
+def test_iter_user_projects_stops_fetching_at_limit(main_module):
+    fetch_page, calls = make_pages(500)
+    projects = list(main_module.iter_user_projects('griffpatch', limit=45, fetch_page=fetch_page))
+    assert [p['id'] for p in projects] == list(range(45))
+    assert calls == [0, 40]
+
+
+def test_iter_user_projects_streams_everything_without_limit(main_module):
+    fetch_page, calls = make_pages(95)
+    projects = main_module.iter_user_projects('griffpatch', limit=0, fetch_page=fetch_page)
+    assert next(projects) == {'id': 0}
+    assert calls == [0]
+    assert len(list(projects)) == 94
+    assert calls == [0, 40, 80]
+
+
+def test_pretty_projects_export_falls_back_to_json(main_module, monkeypatch, tmp_path, capsys):
+    import json
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(main_module.LocalBackend, 'projects', lambda self, username, limit=20, offset=0: iter([{'id': 1}, {'id': 2}]))
+    out = tmp_path / 'projects.txt'
+    main_module.main(['--no-daemon', '--no-cache', '--format', 'pretty', '--export', str(out), 'projects', 'alice'])
+    assert json.loads(out.read_text())['projects'] == [{'id': 1}, {'id': 2}]
+    assert 'pretty export requested' in capsys.readouterr().out
+
+
+def test_iter_user_projects_starts_at_offset(main_module):
+    fetch_page, calls = make_pages(100)
+    projects = list(main_module.iter_user_projects('griffpatch', limit=50, fetch_page=fetch_page, offset=30))
+    assert [p['id'] for p in projects] == list(range(30, 80))
+    assert calls == [30, 70]
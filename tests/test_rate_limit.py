@@ -0,0 +1,59 @@
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_spaces_requests(main_module):
+    clock = FakeClock()
+    bucket = main_module.TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == 0.5
+    assert clock.now == 1.0
+    assert bucket.stats()['allowed'] == 5
+    assert bucket.stats()['delayed'] == 2
+
+
+def test_token_bucket_adapts_to_throttling(main_module):
+    bucket = main_module.TokenBucket(rate=10, burst=1)
+    bucket.penalize()
+    assert bucket.rate == 7
+    for _ in range(100):
+        bucket.reward()
+    assert bucket.rate == 10
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {'Retry-After': '0'}
+        self.text = '{}'
+
+    def json(self):
+        return {}
+
+
+def test_hook_retries_throttled_responses(main_module, monkeypatch):
+    from scratchattach.utils.requests import requests as sa_requests
+
+    statuses = [429, 503, 200]
+
+    def fake_request(method, url, *args, **kwargs):
+        return FakeResponse(statuses.pop(0))
+
+    monkeypatch.setattr(sa_requests, 'request', fake_request)
+    monkeypatch.setattr(sa_requests, '_helper_original', fake_request, raising=False)
+    limiter = main_module.configure_rate_limit(rate=1000, burst=10, retries=3)
+    main_module.install_http_hooks()
+
+    resp = sa_requests.get('https://api.scratch.mit.edu/users/griffpatch')
+    assert resp.status_code == 200
+    assert limiter.stats()['retried'] == 2
+    assert limiter.stats()['throttled'] == 1
+    assert main_module.REQUEST_STATS.total == 3
@@ -0,0 +1,33 @@
+import json
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.text = json.dumps(payload)
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+def test_fetch_user_data_makes_one_request(main_module, monkeypatch):
+    from scratchattach.utils.requests import requests as sa_requests
+
+    calls = []
+
+    def fake_request(method, url, *args, **kwargs):
+        calls.append(url)
+        return FakeResponse({'id': 7, 'username': 'griffpatch', 'profile': {'country': 'Germany'}, 'history': {'joined': '2012'}})
+
+    monkeypatch.setattr(sa_requests, 'request', fake_request)
+    monkeypatch.setattr(sa_requests, '_helper_original', fake_request, raising=False)
+    assert main_module.install_http_hooks()
+
+    data = main_module.fetch_user_data('griffpatch')
+    assert data['username'] == 'griffpatch'
+    assert data['id'] == 7
+    assert len(calls) == 1
+    assert main_module.REQUEST_STATS.total == 1
+    assert 'api.scratch.mit.edu: 1' in main_module.REQUEST_STATS.summary()
@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class FakeSession:
+    def __init__(self, session_id='abc', username='alice'):
+        self.id = session_id
+        self.username = username
+        self.session_string = None
+        self.updates = 0
+
+    def refresh(self):
+        time.sleep(0.02)
+        self.updates += 1
+
+
+class OfflineSession:
+    """Like scratchattach 2.2.5 sessions: no refresh(), only a POST /session update()."""
+
+    def __init__(self):
+        self.id = 'offline'
+        self.username = 'alice'
+        self.session_string = None
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+        return True
+
+
+def test_fresh_session_is_not_revalidated(main_module, tmp_path):
+    path = str(tmp_path / 'session.json')
+    ses = FakeSession()
+    first = main_module.ensure_fresh_session(ses, path=path)
+    assert ses.updates == 1
+    assert main_module.ensure_fresh_session(ses, path=path) == first
+    assert ses.updates == 1
+    # Unchanged sessions are not rewritten (and keep their expiry)
+    assert main_module.save_session_info(ses, path=path) is False
+    info = main_module.read_session_file(path)
+    assert info['expires_at'] == first + main_module.SESSION_TTL
+
+    # A different session, or an expired validation, is checked again
+    other = FakeSession(session_id='xyz')
+    main_module.ensure_fresh_session(other, path=path)
+    assert other.updates == 1
+    info = main_module.read_session_file(path)
+    info['expires_at'] = time.time() - 1
+    main_module._write_session_file(path, info)
+    main_module.ensure_fresh_session(other, path=path)
+    assert other.updates == 2
+
+
+def test_parallel_workers_refresh_once(main_module, tmp_path):
+    path = str(tmp_path / 'session.json')
+    ses = FakeSession()
+    threads = [threading.Thread(target=main_module.ensure_fresh_session, args=(ses,), kwargs={'path': path}) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ses.updates == 1
+    assert main_module.read_session_file(path)['session_id'] == 'abc'
+
+
+def test_backend_revalidates_after_auth_failure(main_module, tmp_path):
+    path = str(tmp_path / 'session.json')
+    ses = FakeSession()
+    backend = main_module.LocalBackend(session=ses, session_file=path)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            raise main_module.optional_import('scratchattach.utils.exceptions').Unauthorized('expired')
+        return 'ok'
+
+    assert backend.authed(call) == 'ok'
+    assert ses.updates == 1
+    assert main_module.session_is_fresh(main_module.read_session_file(path), ses)
+
+
+def test_sessions_without_refresh_are_not_checked_proactively(main_module, tmp_path):
+    path = str(tmp_path / 'session.json')
+    ses = OfflineSession()
+    assert main_module.ensure_fresh_session(ses, path=path) is None
+    assert ses.updates == 0
+    # An auth failure still re-validates them, once
+    main_module.ensure_fresh_session(ses, path=path, force=True)
+    assert ses.updates == 1
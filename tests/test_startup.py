@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+MAIN = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'main.py'))
+
+# Modules that must stay out of the quick paths (imported lazily by the commands that need them)
+HEAVY_MODULES = ('scratchattach', 'rich', 'keyring', 'dotenv', 'asyncio', 'requests', 'yaml', 'sqlite3')
+
+# Budget for all imports done by a cold `main.py --version`, in microseconds as reported by
+# `python -X importtime` (override with STARTUP_BUDGET_US on slow machines)
+STARTUP_BUDGET_US = int(os.environ.get('STARTUP_BUDGET_US', 150000))
+
+
+def importtime(*args, **env):
+    """Run main.py under -X importtime; returns {top-level module: cumulative us} and all module names."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', MAIN, *args],
+        capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1', **env),
+    )
+    assert proc.returncode == 0, proc.stderr
+    top, names = {}, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        names.add(name.strip())
+        if not name[1:].startswith(' '):
+            top[name.strip()] = int(cumulative)
+    return top, names
+
+
+def test_quick_paths_skip_heavy_imports(tmp_path):
+    for args in (['--version'], ['--help'], ['--forget-session']):
+        # HOME points at a scratch dir so --forget-session never touches a real saved session
+        _, names = importtime(*args, HOME=str(tmp_path))
+        loaded = sorted(m for m in names if m.split('.')[0] in HEAVY_MODULES)
+        assert not loaded, f'{args} imported {loaded}'
+
+
+def test_cold_startup_within_budget():
+    top, _ = importtime('--version')
+    total = sum(top.values())
+    assert total < STARTUP_BUDGET_US, f'cold start imports took {total}us (budget {STARTUP_BUDGET_US}us): {top}'
@@ -0,0 +1,28 @@
+import argparse
+
+
+def test_store_upserts_in_batches_and_queries(main_module, tmp_path):
+    path = str(tmp_path / 'store.sqlite')
+    store = main_module.SnapshotStore(path, batch_size=3)
+    store.add_user({'username': 'alice', 'id': 1, 'country': 'Germany', 'join_date': '2014-05-01T00:00:00'})
+    store.add_user({'username': 'bob', 'id': 2, 'country': 'germany', 'join_date': '2016-01-01T00:00:00'})
+    # Not flushed yet: below the batch size
+    assert store._db.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0
+    store.add_user({'username': 'carol', 'id': 3, 'country': 'France', 'join_date': '2017-01-01T00:00:00'})
+    assert store._db.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 3
+    # Re-fetching a user replaces the old snapshot
+    store.add_user({'username': 'Alice', 'id': 1, 'country': 'Germany', 'join_date': '2014-05-01T00:00:00', 'wiwo': 'new'})
+    list(store.tee_projects('alice', [{'id': 10, 'title': 'a', 'views': 5}, {'id': 11, 'title': 'b', 'views': 50}]))
+    store.close()
+
+    store = main_module.SnapshotStore(path)
+    args = argparse.Namespace(table='users', country='GERMANY', joined_after='2015', joined_before=None,
+                              username=None, min_views=None, limit=None)
+    assert [u['username'] for u in store.query('users', **main_module.build_store_query(args))] == ['bob']
+    args.joined_after = None
+    assert [u.get('wiwo') for u in store.query('users', **main_module.build_store_query(args))] == ['new', None]
+    args = argparse.Namespace(table='projects', username='ALICE', min_views=10, limit=None)
+    assert [p['id'] for p in store.query('projects', **main_module.build_store_query(args))] == [11]
+    plan = store._db.execute("EXPLAIN QUERY PLAN SELECT data FROM users WHERE country = ? AND join_date > ?", ('x', '2015')).fetchall()
+    assert 'users_country' in str(plan)
+    store.close()
@@ -0,0 +1,28 @@
+import json
+
+
+def test_spans_are_noops_when_disabled(main_module):
+    assert main_module.TIMINGS is None
+    assert main_module.span('x') is main_module.span('y')
+    main_module.phase('ignored')
+
+
+def test_timings_report_and_chrome_trace(main_module, monkeypatch, tmp_path, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    trace = tmp_path / 'trace.json'
+    main_module.main(['--timings', '--trace', str(trace), '--store', str(tmp_path / 'none.sqlite'), 'query', 'users'])
+    report = capsys.readouterr().err
+    assert 'Timings:' in report and 'config' in report and 'query' in report
+    events = json.loads(trace.read_text())['traceEvents']
+    assert [e['name'] for e in events if e['cat'] == 'phase'] == ['env', 'config', 'query']
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in events)
+
+
+def test_writer_serialization_is_summed(main_module, tmp_path):
+    timings = main_module.enable_timings()
+    with main_module.open_writer('ndjson', str(tmp_path / 'out.ndjson')) as w:
+        w.write_many({'id': i} for i in range(5))
+    with main_module.span('GET https://api.scratch.mit.edu/users/x', 'http'):
+        pass
+    assert timings.totals['serialize'][1] == 5
+    assert 'http (x1)' in timings.summary()
@@ -0,0 +1,51 @@
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_watch_emits_only_changes_and_backs_off(main_module):
+    clock = FakeClock()
+    profile = {'username': 'alice', 'country': 'X', 'wiwo': 'games'}
+    polled_at = []
+
+    def fetch(name):
+        polled_at.append(clock.now)
+        return dict(profile)
+
+    events = []
+    watcher = main_module.Watcher(events.append, interval=10, max_interval=40, clock=clock, sleep=clock.sleep)
+    watcher.add('user:alice', main_module.user_poller('alice', fetch=fetch))
+    watcher.run(max_polls=4)
+    # Unchanged: 10s, then 20s, then capped at 40s between polls
+    assert polled_at == [0, 20, 60, 100]
+    assert events == []
+
+    profile['wiwo'] = 'music'
+    watcher.run(max_polls=6)
+    assert [e['changes'] for e in events] == [{'wiwo': {'old': 'games', 'new': 'music'}}]
+    # A change resets the entity to the base interval
+    assert polled_at[-1] - polled_at[-2] == 10
+
+
+def test_watch_reports_new_messages_once(main_module):
+    inbox = [{'id': 2, 'type': 'loveproject'}, {'id': 1, 'type': 'followuser'}]
+
+    class FakeSession:
+        username = 'me'
+
+        def messages(self, limit=40):
+            return list(inbox)
+
+    poll = main_module.messages_poller(FakeSession())
+    snapshot, events = poll(None)
+    assert events == []
+    inbox[:0] = [{'id': 4, 'type': 'addcomment'}, {'id': 3, 'type': 'curatorinvite'}]
+    snapshot, events = poll(snapshot)
+    assert [e['message']['id'] for e in events] == [3, 4]
+    assert poll(snapshot)[1] == []
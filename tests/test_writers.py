@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+
+import pytest
+
+
+def test_csv_writer_infers_stable_schema_from_first_batch(main_module):
+    out = io.StringIO()
+    w = main_module.CSVWriter(out, schema_batch=2)
+    w.write({'b': 1, 'a': 2})
+    w.write({'a': 3, 'c': {'x': 1}})
+    # Keys first seen after the schema batch are dropped, order never changes
+    w.write({'d': 4, 'a': 5})
+    w.close()
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ['b', 'a', 'c']
+    assert rows[2] == ['', '3', '{"x": 1}']
+    assert rows[3] == ['', '5', '']
+
+
+def test_csv_writer_uses_declared_fieldnames(main_module):
+    out = io.StringIO()
+    with main_module.CSVWriter(out, fieldnames=['id', 'title']) as w:
+        w.write({'title': 't', 'id': 1, 'extra': True})
+    assert out.getvalue().splitlines() == ['id,title', '1,t']
+
+
+def test_ndjson_and_json_writers_produce_valid_output(main_module):
+    out = io.StringIO()
+    with main_module.NDJSONWriter(out) as w:
+        w.write_many({'id': i} for i in range(3))
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [{'id': 0}, {'id': 1}, {'id': 2}]
+
+    out = io.StringIO()
+    with main_module.JSONWriter(out, envelope={'username': 'u', 'projects': None}) as w:
+        w.write_many({'id': i} for i in range(2))
+    assert json.loads(out.getvalue()) == {'username': 'u', 'projects': [{'id': 0}, {'id': 1}]}
+
+    out = io.StringIO()
+    with main_module.JSONWriter(out, envelope={'username': 'u', 'projects': None}):
+        pass
+    assert json.loads(out.getvalue()) == {'username': 'u', 'projects': []}
+
+
+def test_yaml_writer_streams_sequence(main_module):
+    import yaml
+
+    out = io.StringIO()
+    with main_module.YAMLWriter(out, envelope={'username': 'u', 'projects': None}) as w:
+        w.write({'id': 1})
+        w.write({'id': 2})
+    assert yaml.safe_load(out.getvalue()) == {'username': 'u', 'projects': [{'id': 1}, {'id': 2}]}
+
+
+def test_resolve_format_from_extension(main_module):
+    assert main_module.resolve_format(None, 'out.jsonl') == 'ndjson'
+    assert main_module.resolve_format(None, 'out.CSV') == 'csv'
+    assert main_module.resolve_format('yaml', 'out.csv') == 'yaml'
+    assert main_module.resolve_format(None, 'out.txt', default='json') == 'json'
+    assert main_module.resolve_format(None, 'users.parquet') == 'parquet'
+    assert main_module.resolve_format(None, 'users.arrow') == 'arrow'
+
+
+def test_columnar_writers_use_typed_schema_and_row_groups(main_module, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    records = [
+        {'id': str(i), 'username': f'user{i}', 'join_date': '2015-06-01T00:00:00.000Z',
+         'scratchteam': i == 0, 'country': None, 'extra': 'dropped'}
+        for i in range(25)
+    ]
+    records.append({'id': 'not a number', 'username': 'odd', 'join_date': 'never'})
+    path = str(tmp_path / 'users.parquet')
+    with main_module.open_writer('parquet', path, fieldnames=main_module.USER_FIELDS) as w:
+        w.row_group_size = 10
+        w.write_many(records)
+    table = pq.read_table(path)
+    assert table.schema.names == main_module.USER_FIELDS
+    assert table.schema.field('id').type == pa.int64()
+    assert table.schema.field('join_date').type == pa.timestamp('ms', tz='UTC')
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    rows = table.to_pylist()
+    assert rows[1]['id'] == 1 and rows[0]['scratchteam'] is True
+    assert rows[-1]['id'] is None and rows[-1]['join_date'] is None
+
+    path = str(tmp_path / 'projects.arrow')
+    with main_module.open_writer('arrow', path) as w:
+        w.write_many({'id': i, 'title': f'p{i}', 'views': i * 10} for i in range(3))
+    with pa.OSFile(path, 'rb') as f:
+        table = pa.ipc.open_file(f).read_all()
+    assert table.to_pylist() == [{'id': i, 'title': f'p{i}', 'views': i * 10} for i in range(3)]
+
+
+def test_columnar_writer_needs_export_file(main_module):
+    pytest.importorskip('pyarrow')
+    with pytest.raises(RuntimeError):
+        main_module.open_writer('parquet', None)